@@ -2,7 +2,20 @@
 
 from .database import Database
 from .models import Card, Deck, Category
-from .spaced_repetition import SpacedRepetitionEngine
-from .statistics import StatisticsEngine
+from .spaced_repetition import SpacedRepetitionEngine, IntervalPreviewEngine
+from .statistics import StatisticsEngine, DashboardSnapshot
+from .day_clock import DayClock
+from .deduplication import DeduplicationEngine
+from .load_balancer import LoadBalancer
+from .study_session import StudySession
+from .filtered_deck import CardFilter
+from .media_store import MediaStore
+from .async_database import AsyncDatabase
+from .maintenance import MaintenanceScheduler, MaintenanceResult
+from .importer import ImportPipeline, ImportProgress, ImportReport
 
-__all__ = ['Database', 'Card', 'Deck', 'Category', 'SpacedRepetitionEngine', 'StatisticsEngine']
+__all__ = ['Database', 'Card', 'Deck', 'Category', 'SpacedRepetitionEngine', 'StatisticsEngine',
+           'DayClock', 'DeduplicationEngine', 'StudySession', 'IntervalPreviewEngine',
+           'LoadBalancer', 'CardFilter', 'ImportPipeline', 'ImportProgress', 'ImportReport',
+           'MaintenanceScheduler', 'MaintenanceResult', 'MediaStore',
+           'AsyncDatabase', 'DashboardSnapshot']
@@ -0,0 +1,230 @@
+"""asyncio facade over Database and StatisticsEngine"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from .database import Database
+from .day_clock import DayClock
+from .filtered_deck import CardFilter
+from .statistics import StatisticsEngine
+
+
+# Database methods that only read, served by the reader pool
+READ_METHODS = (
+    'get_all_categories', 'get_all_decks', 'get_cards_by_deck', 'get_due_cards',
+    'count_due_cards', 'get_next_due_cards', 'get_review_stats', 'get_total_cards',
+    'get_total_reviews', 'find_duplicate_cards', 'export_deck_to_csv',
+)
+
+# Database methods that write, serialized on the writer thread
+WRITE_METHODS = (
+    'add_category', 'add_deck', 'update_deck', 'delete_deck', 'add_card',
+    'add_cards_batch', 'update_card', 'update_card_review_data', 'reschedule_cards',
+    'delete_card', 'add_review', 'apply_review_batch', 'merge_into_card',
+    'import_deck_from_csv', 'add_decks_batch', 'sync_card_media',
+)
+
+# StatisticsEngine methods that write, serialized on the writer thread
+STATISTICS_WRITE_METHODS = (
+    'save_dashboard_snapshot',
+)
+
+# StatisticsEngine methods, served by the reader pool
+STATISTICS_METHODS = (
+    'get_daily_stats', 'get_category_distribution', 'get_success_rate',
+    'get_study_streak', 'get_cards_due_today', 'get_mastery_level',
+    'get_difficult_cards', 'get_total_study_time', 'get_weekly_heatmap',
+    'get_dashboard_snapshot', 'load_dashboard_snapshot',
+)
+
+
+class AsyncDatabase:
+    """
+    Coroutine versions of the Database and StatisticsEngine methods
+
+    Writes run on a single writer thread that owns the only writing
+    connection. Reads run on a pool of reader threads, each with its own
+    connection; the database is switched to WAL mode so readers never wait
+    for the writer. Identical reads issued while one is already running
+    share its result instead of querying again, so callers must not modify
+    returned objects.
+
+        async with AsyncDatabase("studycards.db") as db:
+            decks = await db.get_all_decks()
+            streak = await db.get_study_streak()
+    """
+
+    def __init__(self, db_path: str = "studycards.db", readers: int = 4,
+                 clock: Optional[DayClock] = None):
+        if db_path == ':memory:':
+            raise ValueError("AsyncDatabase needs a database file shared by its threads")
+        self.db_path = db_path
+        self.readers = readers
+        self.clock = clock or DayClock()
+
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._reader_pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._reader_dbs: List[Database] = []
+        self._reader_lock = threading.Lock()
+        self._write_db: Optional[Database] = None
+        self._write_stats: Optional[StatisticsEngine] = None
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._generation = 0
+
+    # Lifecycle
+    async def start(self):
+        """Open the writer connection, create the schema and start the pools"""
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='studycards-writer')
+        self._reader_pool = ThreadPoolExecutor(
+            max_workers=self.readers, thread_name_prefix='studycards-reader'
+        )
+        await self._run_write(self._open_writer)
+
+    async def close(self):
+        """Close every connection and stop the pools"""
+        loop = asyncio.get_running_loop()
+        # Waiting for running jobs happens off the event loop
+        if self._writer:
+            await self._run_write(lambda: self._write_db.close())
+            await loop.run_in_executor(None, functools.partial(self._writer.shutdown, wait=True))
+            self._writer = None
+        if self._reader_pool:
+            await loop.run_in_executor(
+                None, functools.partial(self._reader_pool.shutdown, wait=True)
+            )
+            self._reader_pool = None
+        for database in self._reader_dbs:
+            database.close()
+        self._reader_dbs.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _open_writer(self):
+        self._write_db = Database(self.db_path, self.clock)
+        self._write_db.initialize()
+        self._write_db.conn.execute("PRAGMA journal_mode = WAL")
+        self._write_stats = StatisticsEngine(self._write_db)
+
+    def _reader_db(self) -> Database:
+        database = getattr(self._local, 'db', None)
+        if database is None:
+            # Closed from the event loop thread once the pool has stopped
+            database = Database(self.db_path, self.clock)
+            database.connect(check_same_thread=False)
+            self._local.db = database
+            self._local.stats = StatisticsEngine(database)
+            with self._reader_lock:
+                self._reader_dbs.append(database)
+        return database
+
+    # Execution
+    async def _run_write(self, func: Callable):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._writer, func)
+        finally:
+            self._generation += 1
+
+    async def _run_read(self, func: Callable, key: Optional[tuple] = None):
+        loop = asyncio.get_running_loop()
+        if key is not None:
+            key = (self._generation,) + key
+            try:
+                shared = self._inflight.get(key)
+            except TypeError:
+                # Unhashable arguments cannot be coalesced
+                key, shared = None, None
+            if shared is not None:
+                return await asyncio.shield(shared)
+
+        future = loop.run_in_executor(self._reader_pool, func)
+        if key is not None:
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a cancelled caller does not cancel the read for the others
+        return await asyncio.shield(future)
+
+    def _call_writer(self, target, name: str, args: tuple, kwargs: dict):
+        result = getattr(target, name)(*args, **kwargs)
+        # Methods such as sync_card_media leave committing to the caller
+        if self._write_db.conn.in_transaction:
+            self._write_db.conn.commit()
+        return result
+
+    def _call_reader(self, name: str, args: tuple, kwargs: dict):
+        return getattr(self._reader_db(), name)(*args, **kwargs)
+
+    def _call_statistics(self, name: str, args: tuple, kwargs: dict):
+        self._reader_db()
+        return getattr(self._local.stats, name)(*args, **kwargs)
+
+    def _fetch_page(self, card_filter: CardFilter, after_id: int, page_size: int) -> List[Dict]:
+        return card_filter.fetch_page(self._reader_db(), after_id, page_size)
+
+    # Streaming
+    async def iter_cards(self, card_filter: Optional[CardFilter] = None,
+                         page_size: int = 500) -> AsyncIterator[Dict]:
+        """
+        Stream cards matching a filter without loading them all at once
+
+        Pages are fetched on the reader pool with keyset pagination.
+
+        Args:
+            card_filter: Filter to apply (None for every card)
+            page_size: Number of cards fetched per query
+
+        Yields:
+            Card dictionaries ordered by id
+        """
+        card_filter = card_filter or CardFilter()
+        last_id = 0
+        while True:
+            page = await self._run_read(
+                functools.partial(self._fetch_page, card_filter, last_id, page_size)
+            )
+            for card in page:
+                yield card
+            if len(page) < page_size:
+                return
+            last_id = page[-1]['id']
+
+
+def _reader_method(name: str, source) -> Callable:
+    @functools.wraps(getattr(source, name))
+    async def method(self, *args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        if source is StatisticsEngine:
+            call = functools.partial(self._call_statistics, name, args, kwargs)
+        else:
+            call = functools.partial(self._call_reader, name, args, kwargs)
+        return await self._run_read(call, key)
+    return method
+
+
+def _writer_method(name: str, source) -> Callable:
+    @functools.wraps(getattr(source, name))
+    async def method(self, *args, **kwargs):
+        target = self._write_stats if source is StatisticsEngine else self._write_db
+        return await self._run_write(
+            functools.partial(self._call_writer, target, name, args, kwargs)
+        )
+    return method
+
+
+for _name in READ_METHODS:
+    setattr(AsyncDatabase, _name, _reader_method(_name, Database))
+for _name in STATISTICS_METHODS:
+    setattr(AsyncDatabase, _name, _reader_method(_name, StatisticsEngine))
+for _name in WRITE_METHODS:
+    setattr(AsyncDatabase, _name, _writer_method(_name, Database))
+for _name in STATISTICS_WRITE_METHODS:
+    setattr(AsyncDatabase, _name, _writer_method(_name, StatisticsEngine))
@@ -0,0 +1,187 @@
+"""Microbenchmarks for StudyCards-Pro core hot paths
+
+Run with: python -m core.benchmarks
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from .database import Database
+from .spaced_repetition import IntervalPreviewEngine, SpacedRepetitionEngine
+from .statistics import StatisticsEngine
+
+
+def _sample_cards(count: int, seed: int = 7) -> List[Dict]:
+    """Build cards with realistic scheduling state"""
+    rng = random.Random(seed)
+    cards = []
+    for card_id in range(count):
+        repetitions = rng.choice([0, 0, 1, 2, 3, 4, 5, 6, 8])
+        ease_factor = 2.5
+        interval = 0
+        for _ in range(repetitions):
+            ease_factor, interval, _ = SpacedRepetitionEngine.calculate_schedule(
+                ease_factor, interval, 2 if interval == 0 else 3, rng.choice([3, 4, 4, 5])
+            )
+        cards.append({
+            'id': card_id,
+            'ease_factor': ease_factor,
+            'interval': interval,
+            'repetitions': repetitions
+        })
+    return cards
+
+
+def _uncached_button_intervals(ease_factor: float, interval: int, repetitions: int) -> dict:
+    """Button previews computed the way get_button_intervals originally did"""
+    intervals = {}
+    for button_idx in range(4):
+        quality = SpacedRepetitionEngine.get_quality_from_button(button_idx)
+        _, new_interval, _, _ = SpacedRepetitionEngine.calculate_next_review(
+            ease_factor, interval, repetitions, quality
+        )
+        intervals[button_idx] = SpacedRepetitionEngine.get_interval_text.__wrapped__(new_interval)
+    return intervals
+
+
+def benchmark_button_intervals(count: int = 20000) -> Dict[str, float]:
+    """
+    Measure the per-card cost of button interval previews
+
+    Args:
+        count: Number of cards to preview
+
+    Returns:
+        Dictionary with microseconds per card for each strategy and the
+        hit rate of the preview cache
+    """
+    cards = _sample_cards(count)
+    engine = IntervalPreviewEngine()
+
+    start = time.perf_counter()
+    for card in cards:
+        _uncached_button_intervals(card['ease_factor'], card['interval'], card['repetitions'])
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for card in cards:
+        engine.preview(card['ease_factor'], card['interval'], card['repetitions'])
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.preview_batch(cards)
+    batch = time.perf_counter() - start
+
+    info = engine.cache_info()
+    return {
+        'uncached_us': uncached / count * 1e6,
+        'cached_us': cached / count * 1e6,
+        'batch_us': batch / count * 1e6,
+        'cache_hit_rate': info.hits / (info.hits + info.misses)
+    }
+
+
+def _build_collection(database: Database, cards: int, reviews: int, seed: int = 11):
+    """Fill a database with decks, scheduled cards and review history"""
+    rng = random.Random(seed)
+    today = database.clock.today()
+    now = datetime.utcnow()
+    categories = [category['id'] for category in database.get_all_categories()]
+    for deck_index in range(10):
+        deck_id = database.add_deck(f"Deck {deck_index}", rng.choice(categories))
+        batch = []
+        for card_index in range(cards // 10):
+            repetitions = rng.randint(0, 8)
+            batch.append({
+                'question': f"Question {deck_index}-{card_index}",
+                'answer': f"Answer {card_index}",
+                'ease_factor': round(rng.uniform(1.3, 2.8), 2),
+                'interval': rng.randint(0, 60) if repetitions else 0,
+                'repetitions': repetitions,
+                'next_review': database.clock.date_of_day(today + rng.randint(-10, 60))
+                if repetitions else None,
+                'reviews': [
+                    (rng.choice([0, 3, 4, 5]),
+                     (now - timedelta(days=rng.randint(0, 120), seconds=rng.randint(0, 86399)))
+                     .strftime('%Y-%m-%d %H:%M:%S'),
+                     rng.randint(2, 40))
+                    for _ in range(reviews // cards)
+                ]
+            })
+        database.add_cards_batch(deck_id, batch)
+
+
+def benchmark_dashboard(cards: int = 20000, reviews: int = 200000,
+                        rounds: int = 5) -> Dict[str, float]:
+    """
+    Compare DashboardSnapshot with the per-method statistics path
+
+    Args:
+        cards: Number of cards in the generated collection
+        reviews: Number of review history rows
+        rounds: Number of timed repetitions of each path
+
+    Returns:
+        Dictionary with milliseconds per dashboard refresh for each path
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = Database(os.path.join(tmp_dir, "benchmark.db"))
+        database.initialize()
+        _build_collection(database, cards, reviews)
+        stats = StatisticsEngine(database)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            stats.get_daily_stats()
+            stats.get_category_distribution()
+            stats.get_success_rate()
+            stats.get_study_streak()
+            stats.get_cards_due_today()
+            stats.get_mastery_level()
+            stats.get_difficult_cards()
+            stats.get_total_study_time()
+            stats.get_weekly_heatmap()
+        per_method = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            stats.get_dashboard_snapshot()
+        snapshot = time.perf_counter() - start
+
+        stats.save_dashboard_snapshot(stats.get_dashboard_snapshot())
+        start = time.perf_counter()
+        for _ in range(rounds):
+            stats.load_dashboard_snapshot()
+        persisted = time.perf_counter() - start
+
+        database.close()
+
+    return {
+        'per_method_ms': per_method / rounds * 1e3,
+        'snapshot_ms': snapshot / rounds * 1e3,
+        'persisted_ms': persisted / rounds * 1e3
+    }
+
+
+def main():
+    """Run every benchmark and print the results"""
+    result = benchmark_dashboard()
+    print("Statistics dashboard (per refresh):")
+    print(f"  nine methods:     {result['per_method_ms']:8.2f} ms")
+    print(f"  snapshot:         {result['snapshot_ms']:8.2f} ms")
+    print(f"  persisted load:   {result['persisted_ms']:8.2f} ms")
+
+    result = benchmark_button_intervals()
+    print("Button interval previews (per card):")
+    print(f"  uncached:    {result['uncached_us']:8.2f} us")
+    print(f"  memoized:    {result['cached_us']:8.2f} us")
+    print(f"  batch:       {result['batch_us']:8.2f} us")
+    print(f"  cache hits:  {result['cache_hit_rate']:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
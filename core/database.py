@@ -7,21 +7,40 @@ from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+from .day_clock import DayClock
+from .deduplication import DeduplicationEngine
+from .media_store import CARD_FIELDS, MediaStore
+
 
 class Database:
     """Manages SQLite database operations for flashcards"""
     
-    def __init__(self, db_path: str = "studycards.db"):
+    def __init__(self, db_path: str = "studycards.db", clock: Optional[DayClock] = None):
         self.db_path = db_path
+        self.clock = clock or DayClock()
         self.conn = None
         
     def initialize(self):
         """Initialize database connection and create tables"""
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        self.connect()
+        # Only takes effect on new databases; MaintenanceScheduler converts older ones
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
         self._create_tables()
         self._insert_default_categories()
         
+    def connect(self, check_same_thread: bool = True):
+        """Open the database connection without touching the schema"""
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=check_same_thread)
+        self.conn.row_factory = sqlite3.Row
+        self._register_functions()
+        
+    def _register_functions(self):
+        """Register the day number SQL functions on the connection"""
+        self.conn.create_function("day_of_date", 1, DayClock.day_of_date, deterministic=True)
+        self.conn.create_function("day_of_timestamp", 1, self.clock.day_of_timestamp,
+                                  deterministic=True)
+        self.conn.create_function("today_day", 0, self.clock.today)
+        
     def _create_tables(self):
         """Create database schema"""
         cursor = self.conn.cursor()
@@ -62,6 +81,7 @@ class Database:
                 interval INTEGER DEFAULT 0,
                 repetitions INTEGER DEFAULT 0,
                 next_review DATE,
+                next_review_day INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (deck_id) REFERENCES decks(id) ON DELETE CASCADE
@@ -76,12 +96,113 @@ class Database:
                 quality INTEGER NOT NULL,
                 reviewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 time_spent INTEGER,
+                review_day INTEGER,
                 FOREIGN KEY (card_id) REFERENCES cards(id) ON DELETE CASCADE
             )
         """)
         
+        # Media attachments, stored on disk by content hash
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS media (
+                hash TEXT PRIMARY KEY,
+                mime TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                filename TEXT,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS card_media (
+                card_id INTEGER NOT NULL,
+                media_hash TEXT NOT NULL,
+                field TEXT NOT NULL,
+                PRIMARY KEY (card_id, media_hash, field),
+                FOREIGN KEY (card_id) REFERENCES cards(id) ON DELETE CASCADE,
+                FOREIGN KEY (media_hash) REFERENCES media(hash)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_card_media_hash ON card_media(media_hash)")
+        
+        # Keep media reference counts in step with card_media
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS card_media_ref_add AFTER INSERT ON card_media
+            BEGIN
+                UPDATE media SET ref_count = ref_count + 1 WHERE hash = NEW.media_hash;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS card_media_ref_remove AFTER DELETE ON card_media
+            BEGIN
+                UPDATE media SET ref_count = ref_count - 1 WHERE hash = OLD.media_hash;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS cards_media_cleanup AFTER DELETE ON cards
+            BEGIN
+                DELETE FROM card_media WHERE card_id = OLD.id;
+            END
+        """)
+        
+        # Last computed statistics dashboard
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generated_at TIMESTAMP NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        
+        # Maintenance job log
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                job TEXT PRIMARY KEY,
+                last_run REAL NOT NULL,
+                duration REAL,
+                detail TEXT
+            )
+        """)
+        
+        self._migrate_day_numbers()
+        
+        # Indexes used by deck, due and filtered deck queries
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_decks_category ON decks(category_id)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cards_deck_due ON cards(deck_id, next_review_day)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_due ON cards(next_review_day)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_ease ON cards(ease_factor)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_review_history_card "
+            "ON review_history(card_id, reviewed_at)"
+        )
+        # Covers the per-day statistics aggregates without touching the table
+        cursor.execute("DROP INDEX IF EXISTS idx_review_history_day")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_review_history_day_stats "
+            "ON review_history(review_day, quality, time_spent, card_id)"
+        )
+        
         self.conn.commit()
         
+    def _migrate_day_numbers(self):
+        """Add and backfill the day number columns of databases created before them"""
+        cursor = self.conn.cursor()
+        
+        cursor.execute("PRAGMA table_info(cards)")
+        if 'next_review_day' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE cards ADD COLUMN next_review_day INTEGER")
+            cursor.execute(
+                """UPDATE cards SET next_review_day = day_of_date(next_review)
+                   WHERE next_review IS NOT NULL"""
+            )
+            
+        cursor.execute("PRAGMA table_info(review_history)")
+        if 'review_day' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE review_history ADD COLUMN review_day INTEGER")
+            cursor.execute("UPDATE review_history SET review_day = day_of_timestamp(reviewed_at)")
+        
     def _insert_default_categories(self):
         """Insert default categories if they don't exist"""
         cursor = self.conn.cursor()
@@ -127,25 +248,26 @@ class Database:
             cursor.execute(
                 """SELECT d.*, c.name as category_name, c.color as category_color,
                    COUNT(DISTINCT cards.id) as card_count,
-                   COUNT(CASE WHEN cards.next_review <= date('now') THEN 1 END) as due_count
+                   COUNT(CASE WHEN cards.next_review_day <= ? THEN 1 END) as due_count
                    FROM decks d 
                    LEFT JOIN categories c ON d.category_id = c.id
                    LEFT JOIN cards ON d.id = cards.deck_id
                    WHERE d.category_id = ?
                    GROUP BY d.id
                    ORDER BY d.name""",
-                (category_id,)
+                (self.clock.today(), category_id)
             )
         else:
             cursor.execute(
                 """SELECT d.*, c.name as category_name, c.color as category_color,
                    COUNT(DISTINCT cards.id) as card_count,
-                   COUNT(CASE WHEN cards.next_review <= date('now') THEN 1 END) as due_count
+                   COUNT(CASE WHEN cards.next_review_day <= ? THEN 1 END) as due_count
                    FROM decks d 
                    LEFT JOIN categories c ON d.category_id = c.id
                    LEFT JOIN cards ON d.id = cards.deck_id
                    GROUP BY d.id
-                   ORDER BY d.name"""
+                   ORDER BY d.name""",
+                (self.clock.today(),)
             )
         return [dict(row) for row in cursor.fetchall()]
         
@@ -190,18 +312,57 @@ class Database:
         if deck_id:
             cursor.execute(
                 """SELECT * FROM cards 
-                   WHERE deck_id = ? AND (next_review IS NULL OR next_review <= date('now'))
-                   ORDER BY next_review""",
-                (deck_id,)
+                   WHERE deck_id = ? AND (next_review_day IS NULL OR next_review_day <= ?)
+                   ORDER BY next_review_day""",
+                (deck_id, self.clock.today())
             )
         else:
             cursor.execute(
                 """SELECT * FROM cards 
-                   WHERE next_review IS NULL OR next_review <= date('now')
-                   ORDER BY next_review"""
+                   WHERE next_review_day IS NULL OR next_review_day <= ?
+                   ORDER BY next_review_day""",
+                (self.clock.today(),)
             )
         return [dict(row) for row in cursor.fetchall()]
         
+    def count_due_cards(self, deck_id: Optional[int] = None) -> int:
+        """Get the number of cards due for review"""
+        cursor = self.conn.cursor()
+        if deck_id:
+            cursor.execute(
+                """SELECT COUNT(*) as count FROM cards
+                   WHERE deck_id = ? AND (next_review_day IS NULL OR next_review_day <= ?)""",
+                (deck_id, self.clock.today())
+            )
+        else:
+            cursor.execute(
+                """SELECT COUNT(*) as count FROM cards
+                   WHERE next_review_day IS NULL OR next_review_day <= ?""",
+                (self.clock.today(),)
+            )
+        return cursor.fetchone()['count']
+        
+    def get_next_due_cards(self, limit: int, deck_id: Optional[int] = None,
+                           exclude_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Get at most `limit` due cards, skipping the given card ids"""
+        conditions = ["(next_review_day IS NULL OR next_review_day <= ?)"]
+        params = [self.clock.today()]
+        if deck_id:
+            conditions.append("deck_id = ?")
+            params.append(deck_id)
+        if exclude_ids:
+            conditions.append(f"id NOT IN ({', '.join('?' * len(exclude_ids))})")
+            params.extend(exclude_ids)
+        params.append(limit)
+
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"""SELECT * FROM cards WHERE {' AND '.join(conditions)}
+                ORDER BY next_review_day, id LIMIT ?""",
+            params
+        )
+        return [dict(row) for row in cursor.fetchall()]
+        
     def add_card(self, deck_id: int, question: str, answer: str, 
                  example: str = "", tags: str = "") -> int:
         """Add a new card"""
@@ -211,8 +372,79 @@ class Database:
                VALUES (?, ?, ?, ?, ?)""",
             (deck_id, question, answer, example, tags)
         )
+        card_id = cursor.lastrowid
+        self.sync_card_media(card_id, {'question': question, 'answer': answer, 'example': example},
+                             remove_stale=False)
         self.conn.commit()
-        return cursor.lastrowid
+        return card_id
+        
+    def add_cards_batch(self, deck_id: int, cards: List[Dict]) -> int:
+        """
+        Add many cards and their review history in a single transaction
+        
+        Args:
+            deck_id: Deck receiving the cards
+            cards: Card dictionaries with question, answer, example, tags,
+                   ease_factor, interval, repetitions, next_review and an
+                   optional 'reviews' list of (quality, reviewed_at, time_spent)
+        
+        Returns:
+            Number of review history rows added
+        """
+        with self.conn:
+            return self._insert_cards(self.conn.cursor(), deck_id, cards)
+        
+    def add_decks_batch(self, category_id: int, decks: List[Dict]) -> List[Tuple[int, int]]:
+        """
+        Add decks with their cards and review history in a single transaction
+        
+        Nothing is kept if any deck or card fails to insert.
+        
+        Args:
+            category_id: Category of the new decks
+            decks: Dictionaries with name, optional description and a 'cards'
+                   list in the add_cards_batch format
+        
+        Returns:
+            List of (deck_id, number of review history rows added) per deck
+        """
+        added = []
+        with self.conn:
+            cursor = self.conn.cursor()
+            for deck in decks:
+                cursor.execute(
+                    "INSERT INTO decks (name, description, category_id) VALUES (?, ?, ?)",
+                    (deck['name'], deck.get('description', ''), category_id)
+                )
+                deck_id = cursor.lastrowid
+                added.append((deck_id, self._insert_cards(cursor, deck_id, deck['cards'])))
+        return added
+        
+    def _insert_cards(self, cursor: sqlite3.Cursor, deck_id: int, cards: List[Dict]) -> int:
+        """Insert cards and their review history in the caller's transaction"""
+        reviews = []
+        for card in cards:
+            cursor.execute(
+                """INSERT INTO cards (deck_id, question, answer, example, tags,
+                   ease_factor, interval, repetitions, next_review, next_review_day)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, day_of_date(?))""",
+                (deck_id, card['question'], card['answer'], card.get('example', ''),
+                 card.get('tags', ''), card.get('ease_factor', 2.5),
+                 card.get('interval', 0), card.get('repetitions', 0),
+                 card.get('next_review'), card.get('next_review'))
+            )
+            card_id = cursor.lastrowid
+            self.sync_card_media(card_id, card, remove_stale=False)
+            reviews.extend(
+                (card_id, quality, reviewed_at, time_spent)
+                for quality, reviewed_at, time_spent in card.get('reviews', ())
+            )
+        cursor.executemany(
+            """INSERT INTO review_history (card_id, quality, reviewed_at, time_spent, review_day)
+               VALUES (?1, ?2, ?3, ?4, day_of_timestamp(?3))""",
+            reviews
+        )
+        return len(reviews)
         
     def update_card(self, card_id: int, question: str, answer: str, 
                     example: str = "", tags: str = ""):
@@ -223,19 +455,75 @@ class Database:
                updated_at = CURRENT_TIMESTAMP WHERE id = ?""",
             (question, answer, example, tags, card_id)
         )
+        self.sync_card_media(card_id, {'question': question, 'answer': answer, 'example': example})
         self.conn.commit()
         
+    def sync_card_media(self, card_id: int, fields: Optional[Dict] = None,
+                        remove_stale: bool = True):
+        """
+        Update a card's media links to match the references in its fields
+        
+        Runs in the caller's transaction; the caller commits.
+        
+        Args:
+            card_id: Card to update
+            fields: Current question/answer/example texts (None to read them)
+            remove_stale: Also remove links no longer referenced by the fields
+        """
+        cursor = self.conn.cursor()
+        if fields is None:
+            cursor.execute("SELECT question, answer, example FROM cards WHERE id = ?", (card_id,))
+            row = cursor.fetchone()
+            fields = dict(row) if row else {}
+        wanted = {
+            (media_hash, field)
+            for field in CARD_FIELDS
+            for media_hash in MediaStore.find_references(fields.get(field))
+        }
+        if not wanted and not remove_stale:
+            return
+
+        cursor.execute("SELECT media_hash, field FROM card_media WHERE card_id = ?", (card_id,))
+        current = {(link['media_hash'], link['field']) for link in cursor.fetchall()}
+        if wanted == current:
+            return
+
+        if remove_stale:
+            cursor.executemany(
+                "DELETE FROM card_media WHERE card_id = ? AND media_hash = ? AND field = ?",
+                [(card_id, media_hash, field) for media_hash, field in current - wanted]
+            )
+        cursor.executemany(
+            """INSERT INTO card_media (card_id, media_hash, field)
+               SELECT ?, hash, ? FROM media WHERE hash = ?""",
+            [(card_id, field, media_hash) for media_hash, field in wanted - current]
+        )
+        
     def update_card_review_data(self, card_id: int, ease_factor: float, 
                                 interval: int, repetitions: int, next_review: str):
         """Update card's spaced repetition data"""
         cursor = self.conn.cursor()
         cursor.execute(
             """UPDATE cards SET ease_factor = ?, interval = ?, repetitions = ?, 
-               next_review = ? WHERE id = ?""",
-            (ease_factor, interval, repetitions, next_review, card_id)
+               next_review = ?, next_review_day = ? WHERE id = ?""",
+            (ease_factor, interval, repetitions, next_review,
+             DayClock.day_of_date(next_review), card_id)
         )
         self.conn.commit()
         
+    def reschedule_cards(self, updates: List[Tuple[int, int]]):
+        """
+        Move cards to new due days in a single transaction
+        
+        Args:
+            updates: List of (card_id, next_review_day) pairs
+        """
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE cards SET next_review = ?, next_review_day = ? WHERE id = ?",
+                [(DayClock.date_of_day(day), day, card_id) for card_id, day in updates]
+            )
+        
     def delete_card(self, card_id: int):
         """Delete a card"""
         cursor = self.conn.cursor()
@@ -246,25 +534,52 @@ class Database:
         """Record a review in history"""
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT INTO review_history (card_id, quality, time_spent) VALUES (?, ?, ?)",
-            (card_id, quality, time_spent)
+            """INSERT INTO review_history (card_id, quality, time_spent, review_day)
+               VALUES (?, ?, ?, ?)""",
+            (card_id, quality, time_spent, self.clock.today())
         )
         self.conn.commit()
         
+    def apply_review_batch(self, reviews: List[Dict]):
+        """
+        Apply several answered reviews in a single transaction
+
+        Args:
+            reviews: Dictionaries with card_id, quality, time_spent, reviewed_at,
+                     ease_factor, interval, repetitions and next_review
+        """
+        with self.conn:
+            self.conn.executemany(
+                """UPDATE cards SET ease_factor = :ease_factor, interval = :interval,
+                   repetitions = :repetitions, next_review = :next_review,
+                   next_review_day = day_of_date(:next_review)
+                   WHERE id = :card_id""",
+                reviews
+            )
+            self.conn.executemany(
+                """INSERT INTO review_history (card_id, quality, reviewed_at, time_spent, review_day)
+                   VALUES (:card_id, :quality, :reviewed_at, :time_spent,
+                           day_of_timestamp(:reviewed_at))""",
+                reviews
+            )
+        
     # Statistics
     def get_review_stats(self, days: int = 30) -> Dict:
         """Get review statistics for the last N days"""
         cursor = self.conn.cursor()
         cursor.execute(
-            """SELECT DATE(reviewed_at) as date, COUNT(*) as count,
-               AVG(quality) as avg_quality
+            """SELECT review_day, COUNT(*) as count, AVG(quality) as avg_quality
                FROM review_history
-               WHERE reviewed_at >= date('now', '-' || ? || ' days')
-               GROUP BY DATE(reviewed_at)
-               ORDER BY date""",
-            (days,)
+               WHERE review_day > ?
+               GROUP BY review_day
+               ORDER BY review_day""",
+            (self.clock.today() - days,)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return [
+            {'date': DayClock.date_of_day(row['review_day']), 'count': row['count'],
+             'avg_quality': row['avg_quality']}
+            for row in cursor.fetchall()
+        ]
         
     def get_total_cards(self) -> int:
         """Get total number of cards"""
@@ -288,19 +603,95 @@ class Database:
                 writer.writeheader()
                 writer.writerows(cards)
                 
-    def import_deck_from_csv(self, deck_id: int, filepath: str):
-        """Import cards from CSV file"""
+    def import_deck_from_csv(self, deck_id: int, filepath: str,
+                             on_duplicate: str = 'keep',
+                             near_threshold: Optional[float] = None) -> Dict[str, int]:
+        """
+        Import cards from CSV file
+
+        Skipping and merging only act on exact duplicates (same text up to
+        case, accents and whitespace). Near-duplicates are imported and
+        counted unless near_threshold opts into acting on them too.
+
+        Args:
+            deck_id: Deck receiving the cards
+            filepath: Path of the CSV file
+            on_duplicate: What to do with cards duplicating a card of the deck
+                          'keep'  = Import them anyway
+                          'skip'  = Drop them
+                          'merge' = Merge tags/example into the existing card
+            near_threshold: Similarity from which near-duplicates are also
+                            skipped or merged, e.g. 0.95 (None for exact only)
+
+        Returns:
+            Dictionary with 'added', 'skipped', 'merged' and 'near_duplicates'
+            counts, the last being near-duplicates that were imported
+        """
+        if on_duplicate not in ('keep', 'skip', 'merge'):
+            raise ValueError(f"Unknown duplicate mode: {on_duplicate}")
+
+        engine = None
+        if on_duplicate != 'keep':
+            engine = DeduplicationEngine(self, keep_punctuation=True)
+            engine.build_index(deck_id)
+
+        counts = {'added': 0, 'skipped': 0, 'merged': 0, 'near_duplicates': 0}
         with open(filepath, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
-                self.add_card(
-                    deck_id,
-                    row.get('question', ''),
-                    row.get('answer', ''),
-                    row.get('example', ''),
-                    row.get('tags', '')
-                )
-                
+                question = row.get('question', '')
+                answer = row.get('answer', '')
+                example = row.get('example', '')
+                tags = row.get('tags', '')
+
+                match_id = engine.find_exact(question, answer) if engine else None
+                if engine and match_id is None:
+                    match = engine.find_match(question, answer)
+                    if match and near_threshold is not None and match[1] >= near_threshold:
+                        match_id = match[0]
+                    elif match:
+                        counts['near_duplicates'] += 1
+
+                if match_id is None:
+                    card_id = self.add_card(deck_id, question, answer, example, tags)
+                    if engine:
+                        engine.add(card_id, question, answer)
+                    counts['added'] += 1
+                elif on_duplicate == 'merge':
+                    self.merge_into_card(match_id, example, tags)
+                    counts['merged'] += 1
+                else:
+                    counts['skipped'] += 1
+        return counts
+
+    def merge_into_card(self, card_id: int, example: str = "", tags: str = ""):
+        """Merge tags and a missing example from a duplicate into a card"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT example, tags FROM cards WHERE id = ?", (card_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return
+
+        merged_tags = [tag.strip() for tag in (row['tags'] or '').split(',') if tag.strip()]
+        for tag in tags.split(','):
+            tag = tag.strip()
+            if tag and tag not in merged_tags:
+                merged_tags.append(tag)
+
+        cursor.execute(
+            """UPDATE cards SET example = ?, tags = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE id = ?""",
+            (row['example'] or example, ', '.join(merged_tags), card_id)
+        )
+        if not row['example']:
+            self.sync_card_media(card_id)
+        self.conn.commit()
+
+    def find_duplicate_cards(self, deck_id: Optional[int] = None,
+                             threshold: float = 0.8) -> List[Dict]:
+        """Get groups of duplicate and near-duplicate cards"""
+        return DeduplicationEngine(self, threshold=threshold).find_duplicates(deck_id)
+
     def close(self):
         """Close database connection"""
         if self.conn:
@@ -0,0 +1,66 @@
+"""Day numbers for scheduling in StudyCards-Pro"""
+
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Optional
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class DayClock:
+    """
+    Maps moments in time to integer study day numbers
+
+    A day number counts days since 1970-01-01. A study day starts at
+    rollover_hour in the user's timezone rather than at midnight UTC, so a
+    review at 2am still belongs to the previous study day with the default
+    rollover of 4am.
+    """
+
+    def __init__(self, rollover_hour: int = 4, tz: Optional[tzinfo] = None):
+        """
+        Args:
+            rollover_hour: Local hour (0-23) at which a new study day starts
+            tz: Timezone of the user (None for the system timezone)
+        """
+        if not 0 <= rollover_hour <= 23:
+            raise ValueError("rollover_hour must be between 0 and 23")
+        self.rollover_hour = rollover_hour
+        self.tz = tz
+
+    def day_of(self, moment: datetime) -> int:
+        """
+        Get the study day number of a moment
+
+        Args:
+            moment: Aware datetime, or naive datetime in UTC
+
+        Returns:
+            Day number
+        """
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        local = moment.astimezone(self.tz) - timedelta(hours=self.rollover_hour)
+        return local.date().toordinal() - _EPOCH_ORDINAL
+
+    def today(self) -> int:
+        """Get the current study day number"""
+        return self.day_of(datetime.now(timezone.utc))
+
+    def day_of_timestamp(self, timestamp: Optional[str]) -> Optional[int]:
+        """Get the study day of a 'YYYY-MM-DD HH:MM:SS' UTC timestamp"""
+        if not timestamp:
+            return None
+        return self.day_of(datetime.fromisoformat(timestamp))
+
+    @staticmethod
+    def day_of_date(date_str: Optional[str]) -> Optional[int]:
+        """Get the day number of a 'YYYY-MM-DD' calendar date"""
+        if not date_str:
+            return None
+        return date.fromisoformat(date_str[:10]).toordinal() - _EPOCH_ORDINAL
+
+    @staticmethod
+    def date_of_day(day: int) -> str:
+        """Get the 'YYYY-MM-DD' calendar date of a day number"""
+        return date.fromordinal(day + _EPOCH_ORDINAL).strftime('%Y-%m-%d')
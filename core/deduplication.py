@@ -0,0 +1,283 @@
+"""Duplicate and near-duplicate card detection for StudyCards-Pro"""
+
+import hashlib
+import random
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+
+# Largest 32-bit prime, used as the modulus of the MinHash permutations
+_MERSENNE_PRIME = 4294967291
+_MAX_HASH = 0xFFFFFFFF
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+class DeduplicationEngine:
+    """
+    Detects duplicate cards using exact hashing and MinHash/LSH
+
+    Exact duplicates are found by hashing the normalized question/answer
+    text. Near-duplicates are found by comparing MinHash signatures of
+    character shingles; candidate pairs are generated through LSH banding,
+    so lookups never compare a card against the whole collection. Buckets
+    holding more than max_bucket cards come from text shared by a whole
+    template ("What is the English translation of ...") rather than from
+    duplicates, and are not used to find candidates.
+
+    Near-duplicate scores are estimates over punctuation-free text: cards
+    such as "sin(x)" -> "cos(x)" and "cos(x)" -> "-sin(x)" score highly, so
+    near matches suit reports rather than unattended skipping or merging.
+    """
+
+    def __init__(self, database=None, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 4, threshold: float = 0.8, seed: int = 1,
+                 keep_punctuation: bool = False, max_bucket: int = 50):
+        if num_perm % bands or bands % 2:
+            raise ValueError("num_perm must be divisible by an even number of bands")
+
+        self.db = database
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.keep_punctuation = keep_punctuation
+        self.max_bucket = max_bucket
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+        self._exact: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+
+    # Text processing
+    @staticmethod
+    def normalize(text: str, keep_punctuation: bool = False) -> str:
+        """
+        Normalize text for comparison
+
+        Args:
+            text: Raw field text
+            keep_punctuation: Keep punctuation instead of replacing it by spaces
+
+        Returns:
+            Lower-cased text without accents, punctuation or repeated whitespace
+        """
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+        if not keep_punctuation:
+            text = _PUNCTUATION_RE.sub(' ', text)
+        return _WHITESPACE_RE.sub(' ', text).strip()
+
+    @classmethod
+    def exact_key(cls, question: str, answer: str, keep_punctuation: bool = False) -> str:
+        """
+        Get the exact-match key of a card
+
+        Args:
+            question: Card question
+            answer: Card answer
+            keep_punctuation: Tell apart cards differing only by punctuation
+
+        Returns:
+            Hex digest of the normalized question/answer pair
+        """
+        content = (cls.normalize(question, keep_punctuation) + '\x1f'
+                   + cls.normalize(answer, keep_punctuation))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _shingles(self, text: str) -> set:
+        """Get the hashed character shingles of normalized text"""
+        size = self.shingle_size
+        if len(text) <= size:
+            return {zlib.crc32(text.encode('utf-8'))}
+        return {
+            zlib.crc32(text[i:i + size].encode('utf-8'))
+            for i in range(len(text) - size + 1)
+        }
+
+    def signature(self, question: str, answer: str) -> Tuple[int, ...]:
+        """
+        Compute the MinHash signature of a card
+
+        Args:
+            question: Card question
+            answer: Card answer
+
+        Returns:
+            Tuple of num_perm minimum hash values: the first half over the
+            question, the second half over the answer
+        """
+        half = self.num_perm // 2
+        signature = []
+        for text, perms in ((question, self._perms[:half]), (answer, self._perms[half:])):
+            shingles = self._shingles(self.normalize(text))
+            signature.extend(
+                min((a * s + b) % _MERSENNE_PRIME for s in shingles) & _MAX_HASH
+                for a, b in perms
+            )
+        return tuple(signature)
+
+    @staticmethod
+    def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """
+        Estimate the similarity of two cards from their MinHash signatures
+
+        Questions and answers are compared separately, so cards sharing a
+        long template but with different answers are not similar.
+
+        Returns:
+            Lower of the question and answer Jaccard estimates (0.0-1.0)
+        """
+        half = len(sig_a) // 2
+        question = sum(1 for a, b in zip(sig_a[:half], sig_b[:half]) if a == b)
+        answer = sum(1 for a, b in zip(sig_a[half:], sig_b[half:]) if a == b)
+        return min(question, answer) / half
+
+    def _bands_of(self, sig: Tuple[int, ...]):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (band, sig[start:start + self.rows])
+
+    # Index operations
+    def clear(self):
+        """Remove every card from the index"""
+        self._exact.clear()
+        self._keys.clear()
+        self._signatures.clear()
+        self._buckets.clear()
+
+    def add(self, card_id: int, question: str, answer: str):
+        """
+        Add a card to the index
+
+        Exact copies of an indexed card are only recorded by key, so LSH
+        buckets hold one representative per distinct content.
+        """
+        key = self.exact_key(question, answer, self.keep_punctuation)
+        self._keys[card_id] = key
+        if key in self._exact:
+            return
+        self._exact[key] = card_id
+        sig = self.signature(question, answer)
+        self._signatures[card_id] = sig
+        for band in self._bands_of(sig):
+            self._buckets[band].append(card_id)
+
+    def build_index(self, deck_id: Optional[int] = None):
+        """
+        Index existing cards from the database
+
+        Args:
+            deck_id: Only index cards of this deck (None for the whole collection)
+        """
+        self.clear()
+        cursor = self.db.conn.cursor()
+        if deck_id:
+            cursor.execute(
+                "SELECT id, question, answer FROM cards WHERE deck_id = ? ORDER BY id",
+                (deck_id,)
+            )
+        else:
+            cursor.execute("SELECT id, question, answer FROM cards ORDER BY id")
+        for row in cursor:
+            self.add(row['id'], row['question'], row['answer'])
+
+    def find_exact(self, question: str, answer: str) -> Optional[int]:
+        """Get the id of an indexed card with the same normalized content"""
+        return self._exact.get(self.exact_key(question, answer, self.keep_punctuation))
+
+    def find_match(self, question: str, answer: str) -> Optional[Tuple[int, float]]:
+        """
+        Find an indexed card that duplicates the given content
+
+        Args:
+            question: Card question
+            answer: Card answer
+
+        Returns:
+            Tuple of (card_id, similarity), or None if no duplicate is indexed
+        """
+        card_id = self.find_exact(question, answer)
+        if card_id is not None:
+            return (card_id, 1.0)
+
+        sig = self.signature(question, answer)
+        best = None
+        for candidate in self._candidates(sig):
+            score = self.similarity(sig, self._signatures[candidate])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+        return best
+
+    def _candidates(self, sig: Tuple[int, ...]) -> set:
+        candidates = set()
+        for band in self._bands_of(sig):
+            bucket = self._buckets.get(band, ())
+            if len(bucket) <= self.max_bucket:
+                candidates.update(bucket)
+        return candidates
+
+    # Reports
+    def find_duplicates(self, deck_id: Optional[int] = None) -> List[Dict]:
+        """
+        Build a duplicate report for the collection
+
+        Args:
+            deck_id: Only check cards of this deck (None for the whole collection)
+
+        Returns:
+            List of duplicate groups, each with the card ids, whether the group
+            is an exact match and the lowest similarity that joined the group
+        """
+        self.build_index(deck_id)
+
+        # Each card joins the most similar earlier group leader, so groups
+        # never chain through intermediate cards
+        leaders: Dict[int, int] = {}
+        link_scores: Dict[int, float] = {}
+        for card_id in sorted(self._signatures):
+            sig = self._signatures[card_id]
+            best = None
+            compared = set()
+            for candidate in self._candidates(sig):
+                if candidate >= card_id or leaders[candidate] in compared:
+                    continue
+                leader = leaders[candidate]
+                compared.add(leader)
+                score = self.similarity(sig, self._signatures[leader])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (leader, score)
+            if best is None:
+                leaders[card_id] = card_id
+            else:
+                leaders[card_id] = best[0]
+                link_scores[best[0]] = min(best[1], link_scores.get(best[0], 1.0))
+
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for card_id, key in self._keys.items():
+            groups[leaders[self._exact[key]]].append(card_id)
+
+        report = []
+        for root, ids in groups.items():
+            if len(ids) < 2:
+                continue
+            ids.sort()
+            report.append({
+                'card_ids': ids,
+                'exact': len({self._keys[card_id] for card_id in ids}) == 1,
+                'similarity': round(link_scores.get(root, 1.0), 3)
+            })
+
+        report.sort(key=lambda group: (-len(group['card_ids']), group['card_ids'][0]))
+        return report
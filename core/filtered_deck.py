@@ -0,0 +1,248 @@
+"""Filtered "custom study" deck queries for StudyCards-Pro"""
+
+import shlex
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+
+
+_COMPARISONS = ('<=', '>=', '<', '>', '=')
+
+# SQL template of every clause kind; {op} is filled from _COMPARISONS only
+_CLAUSES = {
+    'deck': "c.deck_id = ?",
+    'category': """c.deck_id IN (
+                SELECT d.id FROM decks d JOIN categories cat ON cat.id = d.category_id
+                WHERE cat.name = ? COLLATE NOCASE)""",
+    'tag': "(',' || REPLACE(IFNULL(c.tags, ''), ' ', '') || ',') LIKE ? ESCAPE '\\'",
+    'text': "(c.question LIKE ? ESCAPE '\\' OR c.answer LIKE ? ESCAPE '\\')",
+    'ease': "c.ease_factor {op} ?",
+    'interval': "c.interval {op} ?",
+    'repetitions': "c.repetitions {op} ?",
+    'due': "(c.next_review_day IS NULL OR c.next_review_day <= today_day())",
+    'new': "c.repetitions = 0",
+    'lapsed': """c.id IN (
+                SELECT r.card_id FROM review_history r
+                WHERE r.review_day > today_day() - ? AND r.quality < 3)""",
+    'reviewed': """c.id IN (
+                SELECT r.card_id FROM review_history r
+                WHERE r.review_day > today_day() - ?)""",
+}
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user values match literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+@lru_cache(maxsize=256)
+def _compile_plan(shape: Tuple[Tuple[str, str], ...], paged: bool) -> str:
+    """
+    Compile a filter shape to SQL
+
+    The shape only holds clause kinds and operators, never values, so every
+    filter with the same structure reuses one cached statement.
+    """
+    conditions = [_CLAUSES[kind].format(op=op) for kind, op in shape]
+    if paged:
+        conditions.append("c.id > ?")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT c.* FROM cards c {where} ORDER BY c.id"
+    if paged:
+        sql += " LIMIT ?"
+    return sql
+
+
+class CardFilter:
+    """
+    Builds filtered deck queries over cards, decks, categories and reviews
+
+    Filters are combined with AND and compiled to parameterized SQL. They
+    can be built with chained calls or parsed from a search string:
+
+        CardFilter().category('Mathematics').tag('calculus').ease('<', 1.8)
+        CardFilter.parse('category:Mathematics tag:calculus ease<1.8 lapsed:7')
+    """
+
+    def __init__(self):
+        self._clauses: List[Tuple[str, str, tuple]] = []
+
+    def _add(self, kind: str, params: tuple, op: str = '') -> 'CardFilter':
+        self._clauses.append((kind, op, params))
+        return self
+
+    # Builder
+    def deck(self, deck_id: int) -> 'CardFilter':
+        """Only cards of the given deck"""
+        return self._add('deck', (deck_id,))
+
+    def category(self, name: str) -> 'CardFilter':
+        """Only cards whose deck belongs to the named category"""
+        return self._add('category', (name,))
+
+    def tag(self, tag: str) -> 'CardFilter':
+        """Only cards carrying the tag"""
+        return self._add('tag', (f"%,{_escape_like(tag.replace(' ', ''))},%",))
+
+    def text(self, text: str) -> 'CardFilter':
+        """Only cards whose question or answer contains the text"""
+        pattern = f"%{_escape_like(text)}%"
+        return self._add('text', (pattern, pattern))
+
+    def ease(self, op: str, value: float) -> 'CardFilter':
+        """Compare the ease factor, e.g. ease('<', 1.8)"""
+        return self._add('ease', (float(value),), self._check_op(op))
+
+    def interval(self, op: str, value: int) -> 'CardFilter':
+        """Compare the current interval in days"""
+        return self._add('interval', (int(value),), self._check_op(op))
+
+    def repetitions(self, op: str, value: int) -> 'CardFilter':
+        """Compare the number of consecutive correct repetitions"""
+        return self._add('repetitions', (int(value),), self._check_op(op))
+
+    def due(self) -> 'CardFilter':
+        """Only cards due for review"""
+        return self._add('due', ())
+
+    def new(self) -> 'CardFilter':
+        """Only cards never answered correctly"""
+        return self._add('new', ())
+
+    def lapsed_within(self, days: int) -> 'CardFilter':
+        """Only cards failed at least once in the last N days"""
+        return self._add('lapsed', (int(days),))
+
+    def reviewed_within(self, days: int) -> 'CardFilter':
+        """Only cards reviewed in the last N days"""
+        return self._add('reviewed', (int(days),))
+
+    @staticmethod
+    def _check_op(op: str) -> str:
+        if op not in _COMPARISONS:
+            raise ValueError(f"Unsupported comparison: {op}")
+        return op
+
+    # Query language
+    @classmethod
+    def parse(cls, query: str) -> 'CardFilter':
+        """
+        Parse a search string into a filter
+
+        Supported terms:
+            deck:ID, category:NAME, tag:NAME, lapsed:DAYS, reviewed:DAYS,
+            is:due, is:new, ease<1.8, interval>=30, repetitions=0
+            Any other word is matched against question and answer text.
+            Values containing spaces can be quoted: category:"Computer Science"
+
+        Args:
+            query: Search string
+
+        Returns:
+            Filter matching every term
+        """
+        result = cls()
+        for term in shlex.split(query):
+            key, sep, value = term.partition(':')
+            if sep and key == 'deck':
+                result.deck(int(value))
+            elif sep and key == 'category':
+                result.category(value)
+            elif sep and key == 'tag':
+                result.tag(value)
+            elif sep and key == 'lapsed':
+                result.lapsed_within(int(value.rstrip('d')))
+            elif sep and key == 'reviewed':
+                result.reviewed_within(int(value.rstrip('d')))
+            elif sep and key == 'is' and value in ('due', 'new'):
+                getattr(result, value)()
+            elif not cls._parse_comparison(result, term):
+                result.text(term)
+        return result
+
+    @staticmethod
+    def _parse_comparison(result: 'CardFilter', term: str) -> bool:
+        for field in ('ease', 'interval', 'repetitions'):
+            if not term.startswith(field):
+                continue
+            rest = term[len(field):]
+            for op in _COMPARISONS:
+                if rest.startswith(op):
+                    getattr(result, field)(op, rest[len(op):])
+                    return True
+        return False
+
+    # Compilation
+    def shape(self) -> Tuple[Tuple[str, str], ...]:
+        """Get the structure of the filter, used as the plan cache key"""
+        return tuple((kind, op) for kind, op, _ in self._clauses)
+
+    def params(self) -> List:
+        """Get the SQL parameters in clause order"""
+        return [param for _, _, params in self._clauses for param in params]
+
+    def compile(self) -> Tuple[str, List]:
+        """
+        Compile the filter
+
+        Returns:
+            Tuple of (sql, params)
+        """
+        return (_compile_plan(self.shape(), False), self.params())
+
+    # Execution
+    def fetch(self, database) -> List[Dict]:
+        """Get every matching card"""
+        sql, params = self.compile()
+        cursor = database.conn.cursor()
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def count(self, database) -> int:
+        """Get the number of matching cards"""
+        sql, params = self.compile()
+        cursor = database.conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) as count FROM ({sql})", params)
+        return cursor.fetchone()['count']
+
+    def iter_pages(self, database, page_size: int = 500,
+                   after_id: int = 0) -> Iterator[List[Dict]]:
+        """
+        Stream matching cards page by page using keyset pagination
+
+        Each page resumes after the last card id of the previous one, so
+        pages cost the same however deep the scan goes.
+
+        Args:
+            database: Database to query
+            page_size: Maximum number of cards per page
+            after_id: Only return cards with a greater id
+
+        Yields:
+            Lists of card dictionaries ordered by id
+        """
+        last_id = after_id
+        while True:
+            page = self.fetch_page(database, last_id, page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]['id']
+
+    def fetch_page(self, database, after_id: int = 0, page_size: int = 500) -> List[Dict]:
+        """Get the first `page_size` matching cards with an id above after_id"""
+        sql = _compile_plan(self.shape(), True)
+        cursor = database.conn.cursor()
+        cursor.execute(sql, self.params() + [after_id, page_size])
+        return [dict(row) for row in cursor.fetchall()]
+
+    def iter_cards(self, database, page_size: int = 500) -> Iterator[Dict]:
+        """Stream matching cards one at a time"""
+        for page in self.iter_pages(database, page_size):
+            yield from page
+
+    @staticmethod
+    def plan_cache_info():
+        """Get hit/miss statistics of the compiled plan cache"""
+        return _compile_plan.cache_info()
@@ -0,0 +1,358 @@
+"""Bulk import pipeline for CSV, JSON and Anki .apkg sources"""
+
+import csv
+import html
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .spaced_repetition import SpacedRepetitionEngine
+
+
+SUPPORTED_SUFFIXES = ('.csv', '.json', '.apkg')
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_HTML_BREAK_RE = re.compile(r'<br\s*/?>|</div>|</p>', re.IGNORECASE)
+
+
+@dataclass
+class ImportProgress:
+    """Progress of a single imported file"""
+    path: str
+    status: str = 'pending'
+    decks: int = 0
+    rows: int = 0
+    skipped: int = 0
+    reviews: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class ImportReport:
+    """Result of an import run"""
+    files: List[ImportProgress] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(progress.rows for progress in self.files)
+
+    @property
+    def failed(self) -> List[ImportProgress]:
+        return [progress for progress in self.files if progress.status == 'failed']
+
+    @property
+    def empty(self) -> List[ImportProgress]:
+        return [progress for progress in self.files if progress.status == 'empty']
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+# Parsing (runs inside worker processes)
+def _clean_field(text: str) -> str:
+    """Convert a possibly HTML formatted field to plain text"""
+    text = _HTML_BREAK_RE.sub('\n', text or '')
+    text = _HTML_TAG_RE.sub('', text)
+    return html.unescape(text).strip()
+
+
+def _card_from_mapping(row: Dict) -> Dict:
+    """Normalize a card read from CSV or JSON"""
+    tags = row.get('tags') or ''
+    if isinstance(tags, list):
+        tags = ', '.join(tags)
+    return {
+        'question': (row.get('question') or '').strip(),
+        'answer': (row.get('answer') or '').strip(),
+        'example': (row.get('example') or '').strip(),
+        'tags': tags,
+        'ease_factor': float(row.get('ease_factor') or 2.5),
+        'interval': int(row.get('interval') or 0),
+        'repetitions': int(row.get('repetitions') or 0),
+        'next_review': _check_date(row.get('next_review')),
+        'reviews': [
+            (int(review['quality']), _check_timestamp(review['reviewed_at']),
+             int(review.get('time_spent') or 0))
+            for review in row.get('reviews', [])
+        ]
+    }
+
+
+def _check_date(value: Optional[str]) -> Optional[str]:
+    """Normalize a due date to 'YYYY-MM-DD', raising ValueError if invalid"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid next_review date: {value!r}") from None
+
+
+def _check_timestamp(value: str) -> str:
+    """Normalize a review time to a UTC 'YYYY-MM-DD HH:MM:SS', raising ValueError if invalid"""
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid reviewed_at timestamp: {value!r}") from None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _parse_csv(path: Path) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        cards = [_card_from_mapping(row) for row in csv.DictReader(f)]
+    return [{'name': path.stem, 'cards': cards}]
+
+
+def _parse_json(path: Path) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        data = {'name': path.stem, 'cards': data}
+    decks = data['decks'] if 'decks' in data else [data]
+    return [
+        {
+            'name': deck.get('name') or path.stem,
+            'description': deck.get('description', ''),
+            'cards': [_card_from_mapping(card) for card in deck.get('cards', [])]
+        }
+        for deck in decks
+    ]
+
+
+def _parse_apkg(path: Path) -> List[Dict]:
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        for collection_name in ('collection.anki21', 'collection.anki2'):
+            if collection_name in names:
+                break
+        else:
+            raise ValueError("Unsupported .apkg: no collection.anki2/anki21 database "
+                             "(packages exported in the newer compressed format are not supported)")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            collection_path = archive.extract(collection_name, tmp_dir)
+            conn = sqlite3.connect(collection_path)
+            try:
+                return _read_anki_collection(conn)
+            finally:
+                conn.close()
+
+
+def _read_anki_collection(conn: sqlite3.Connection) -> List[Dict]:
+    conn.row_factory = sqlite3.Row
+    col = conn.execute("SELECT crt, decks FROM col").fetchone()
+    created = datetime.fromtimestamp(col['crt']).date()
+    deck_names = {int(deck_id): deck['name'] for deck_id, deck in json.loads(col['decks']).items()}
+
+    reviews: Dict[int, List] = {}
+    # ease 0 marks manual reschedules, not answers
+    for row in conn.execute(
+        "SELECT id, cid, ease, time FROM revlog WHERE ease BETWEEN 1 AND 4 ORDER BY id"
+    ):
+        reviewed_at = datetime.utcfromtimestamp(row['id'] / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        quality = SpacedRepetitionEngine.get_quality_from_button(row['ease'] - 1)
+        reviews.setdefault(row['cid'], []).append((quality, reviewed_at, row['time'] // 1000))
+
+    decks: Dict[int, Dict] = {}
+    for row in conn.execute(
+        """SELECT c.id, c.did, c.type, c.ivl, c.factor, c.reps, c.due, n.flds, n.tags
+           FROM cards c JOIN notes n ON n.id = c.nid ORDER BY c.id"""
+    ):
+        fields = row['flds'].split('\x1f')
+        next_review = None
+        if row['type'] == 2:
+            next_review = (created + timedelta(days=row['due'])).strftime('%Y-%m-%d')
+        elif row['type'] in (1, 3):
+            next_review = datetime.fromtimestamp(row['due']).strftime('%Y-%m-%d')
+
+        deck = decks.setdefault(row['did'], {
+            'name': deck_names.get(row['did'], 'Imported'),
+            'cards': []
+        })
+        deck['cards'].append({
+            'question': _clean_field(fields[0]),
+            'answer': _clean_field(fields[1]) if len(fields) > 1 else '',
+            'example': _clean_field(fields[2]) if len(fields) > 2 else '',
+            'tags': ', '.join(row['tags'].split()),
+            'ease_factor': row['factor'] / 1000 if row['factor'] else 2.5,
+            'interval': max(0, row['ivl']),
+            'repetitions': row['reps'] if row['type'] == 2 else 0,
+            'next_review': next_review,
+            'reviews': reviews.get(row['id'], [])
+        })
+    return list(decks.values())
+
+
+def parse_source(path: str) -> Dict:
+    """
+    Parse one import source into normalized decks
+
+    Args:
+        path: Path of a .csv, .json or .apkg file
+
+    Returns:
+        Dictionary with the source path, its decks, the number of rows
+        skipped for lacking a question or answer and the parse time
+    """
+    start = time.perf_counter()
+    source = Path(path)
+    suffix = source.suffix.lower()
+    if suffix == '.csv':
+        decks = _parse_csv(source)
+    elif suffix == '.json':
+        decks = _parse_json(source)
+    elif suffix == '.apkg':
+        decks = _parse_apkg(source)
+    else:
+        raise ValueError(f"Unsupported import format: {suffix}")
+
+    skipped = 0
+    for deck in decks:
+        cards = [card for card in deck['cards'] if card['question'] and card['answer']]
+        skipped += len(deck['cards']) - len(cards)
+        deck['cards'] = cards
+    return {'path': path, 'decks': decks, 'skipped': skipped,
+            'parse_time': time.perf_counter() - start}
+
+
+class ImportPipeline:
+    """
+    Imports many files into the database in parallel
+
+    Files are parsed and normalized in a process pool; the calling thread is
+    the single writer and stores each file's decks with their cards and
+    review history in one transaction, so a file either imports completely
+    or is reported as failed without affecting the others.
+    """
+
+    def __init__(self, database, workers: Optional[int] = None,
+                 category_id: Optional[int] = None,
+                 progress_callback: Optional[Callable[[ImportProgress], None]] = None):
+        self.db = database
+        self.workers = workers
+        self.category_id = category_id
+        self.progress_callback = progress_callback
+
+    @staticmethod
+    def discover(directory: str) -> List[str]:
+        """Get every supported file below a directory"""
+        return sorted(
+            str(path) for path in Path(directory).rglob('*')
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES
+        )
+
+    def run(self, source: str) -> ImportReport:
+        """
+        Import a directory, a .zip archive of sources or a single file
+
+        Args:
+            source: Path to import
+
+        Returns:
+            Report with per-file progress and throughput
+        """
+        if os.path.isdir(source):
+            return self.import_files(self.discover(source))
+
+        if source.lower().endswith('.zip'):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                with zipfile.ZipFile(source) as archive:
+                    archive.extractall(tmp_dir)
+                return self.import_files(self.discover(tmp_dir))
+
+        return self.import_files([source])
+
+    def import_files(self, paths: List[str]) -> ImportReport:
+        """Import the given files"""
+        start = time.perf_counter()
+        category_id = self.category_id or self._default_category()
+        progress = {path: ImportProgress(path) for path in paths}
+        report = ImportReport(files=list(progress.values()))
+
+        if self.workers == 0:
+            results = (self._parse_safely(path) for path in paths)
+            for path, parsed, error in results:
+                self._store(progress[path], parsed, error, category_id)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(parse_source, path): path for path in paths}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        parsed, error = future.result(), None
+                    except Exception as exc:
+                        parsed, error = None, exc
+                    self._store(progress[path], parsed, error, category_id)
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def _parse_safely(path: str):
+        try:
+            return (path, parse_source(path), None)
+        except Exception as exc:
+            return (path, None, exc)
+
+    def _store(self, progress: ImportProgress, parsed: Optional[Dict],
+               error: Optional[Exception], category_id: int):
+        start = time.perf_counter()
+        if error is not None:
+            progress.status = 'failed'
+            progress.error = f"{type(error).__name__}: {error}"
+            self._notify(progress)
+            return
+
+        progress.status = 'writing'
+        progress.skipped = parsed['skipped']
+        decks = [deck for deck in parsed['decks'] if deck['cards']]
+        try:
+            added = self.db.add_decks_batch(category_id, decks)
+        except sqlite3.Error as exc:
+            # The file's transaction was rolled back; other files still import
+            progress.status = 'failed'
+            progress.error = f"{type(exc).__name__}: {exc}"
+            progress.elapsed = parsed['parse_time'] + time.perf_counter() - start
+            self._notify(progress)
+            return
+
+        progress.decks = len(added)
+        progress.rows = sum(len(deck['cards']) for deck in decks)
+        progress.reviews = sum(reviews for _, reviews in added)
+        if progress.decks:
+            progress.status = 'done'
+        else:
+            # Nothing importable, e.g. a CSV without question/answer columns
+            progress.status = 'empty'
+            progress.error = f"No valid cards ({progress.skipped} rows skipped)"
+        progress.elapsed = parsed['parse_time'] + time.perf_counter() - start
+        self._notify(progress)
+
+    def _notify(self, progress: ImportProgress):
+        if self.progress_callback:
+            self.progress_callback(progress)
+
+    def _default_category(self) -> int:
+        for category in self.db.get_all_categories():
+            if category['name'] == 'General':
+                return category['id']
+        return self.db.add_category('General')
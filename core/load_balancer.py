@@ -0,0 +1,152 @@
+"""Review load balancing for StudyCards-Pro"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+class LoadBalancer:
+    """
+    Spreads due dates to flatten daily review spikes
+
+    SM-2 gives every card an exact interval, so cards imported or learned
+    together keep coming due on the same days. The balancer widens each
+    interval to a fuzz window and picks the day in that window with the
+    fewest scheduled cards. Per-day counts are loaded once and kept up to
+    date as cards are scheduled through the balancer; call refresh() after
+    cards were rescheduled by other means.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self._histogram: Optional[Dict[int, int]] = None
+
+    # Due histogram
+    def refresh(self):
+        """Reload the per-day due counts from the database"""
+        cursor = self.db.conn.cursor()
+        cursor.execute(
+            """SELECT next_review_day, COUNT(*) as count FROM cards
+               WHERE next_review_day IS NOT NULL
+               GROUP BY next_review_day"""
+        )
+        self._histogram = {row['next_review_day']: row['count'] for row in cursor.fetchall()}
+
+    @property
+    def histogram(self) -> Dict[int, int]:
+        if self._histogram is None:
+            self.refresh()
+        return self._histogram
+
+    def due_on(self, day: int) -> int:
+        """Get the number of cards scheduled on a day"""
+        return self.histogram.get(day, 0)
+
+    def _move(self, old_day: Optional[int], new_day: int):
+        histogram = self.histogram
+        if old_day is not None and histogram.get(old_day, 0) > 0:
+            histogram[old_day] -= 1
+        histogram[new_day] = histogram.get(new_day, 0) + 1
+
+    # Scheduling
+    @staticmethod
+    def fuzz_range(interval: int) -> Tuple[int, int]:
+        """
+        Get the interval range a card may be moved within
+
+        Args:
+            interval: Interval computed by SM-2, in days
+
+        Returns:
+            Tuple of (min_interval, max_interval)
+        """
+        if interval < 3:
+            return (interval, interval)
+        if interval < 7:
+            fuzz = max(1, round(interval * 0.25))
+        elif interval < 30:
+            fuzz = max(2, round(interval * 0.15))
+        else:
+            fuzz = max(4, round(interval * 0.05))
+        return (max(2, interval - fuzz), interval + fuzz)
+
+    def _least_loaded(self, first_day: int, last_day: int, target_day: int) -> int:
+        """Pick the least loaded day, preferring days close to the target"""
+        histogram = self.histogram
+        return min(
+            range(first_day, last_day + 1),
+            key=lambda day: (histogram.get(day, 0), abs(day - target_day), day)
+        )
+
+    def schedule(self, interval: int, today: int, previous_day: Optional[int] = None) -> int:
+        """
+        Choose a balanced interval for a card that was just answered
+
+        Args:
+            interval: Interval computed by SM-2, in days
+            today: Current study day number
+            previous_day: Day the card was scheduled on before, if any
+
+        Returns:
+            Interval to use instead, within the card's fuzz range
+        """
+        low, high = self.fuzz_range(interval)
+        day = self._least_loaded(today + low, today + high, today + interval)
+        self._move(previous_day, day)
+        return day - today
+
+    # Batch rescheduling
+    def smooth_backlog(self, deck_id: Optional[int] = None, spread_days: int = 0) -> int:
+        """
+        Reschedule existing cards to flatten the upcoming review load
+
+        Cards scheduled in the future are moved within their fuzz window to
+        the least loaded day. With spread_days, overdue cards are also spread
+        over the next spread_days days, most overdue first.
+
+        Args:
+            deck_id: Only reschedule cards of this deck (None for all decks)
+            spread_days: Number of days to spread overdue cards over (0 to
+                         leave overdue cards due today)
+
+        Returns:
+            Number of cards moved
+        """
+        today = self.db.clock.today()
+        self.refresh()
+
+        deck_filter = "AND deck_id = ?" if deck_id else ""
+        params = (today, deck_id) if deck_id else (today,)
+        cursor = self.db.conn.cursor()
+        updates: List[Tuple[int, int]] = []
+
+        if spread_days > 0:
+            cursor.execute(
+                f"""SELECT id, next_review_day FROM cards
+                    WHERE next_review_day < ? {deck_filter}
+                    ORDER BY next_review_day, id""",
+                params
+            )
+            for row in cursor.fetchall():
+                day = self._least_loaded(today, today + spread_days - 1, today)
+                self._move(row['next_review_day'], day)
+                updates.append((row['id'], day))
+
+        cursor.execute(
+            f"""SELECT id, interval, next_review_day FROM cards
+                WHERE next_review_day > ? {deck_filter}
+                ORDER BY next_review_day, id""",
+            params
+        )
+        for row in cursor.fetchall():
+            low, high = self.fuzz_range(row['interval'])
+            current = row['next_review_day']
+            first_day = max(today + 1, current - (row['interval'] - low))
+            last_day = current + (high - row['interval'])
+
+            self.histogram[current] -= 1
+            day = self._least_loaded(first_day, last_day, current)
+            self._move(None, day)
+            if day != current:
+                updates.append((row['id'], day))
+
+        self.db.reschedule_cards(updates)
+        return len(updates)
@@ -0,0 +1,301 @@
+"""Periodic database maintenance for StudyCards-Pro"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+# Seconds between two runs of each job
+DEFAULT_INTERVALS = {
+    'prune_history': 24 * 3600,
+    'incremental_vacuum': 24 * 3600,
+    'optimize': 24 * 3600,
+    'analyze': 7 * 24 * 3600,
+    'integrity_check': 7 * 24 * 3600,
+}
+
+# Start of the logged detail of a job that raised
+FAILED_PREFIX = "failed: "
+
+
+@dataclass
+class MaintenanceResult:
+    """Outcome of a maintenance job"""
+    job: str
+    duration: float
+    detail: str = ""
+    failed: bool = False
+
+
+class MaintenanceScheduler:
+    """
+    Runs database maintenance jobs while the application is idle
+
+    Call run_pending() periodically, e.g. from a GUI timer. Jobs only start
+    once no foreground write has been seen for idle_seconds, and long jobs
+    work in small steps: when a foreground write happens between two steps
+    the job is paused and resumed on a later call. Each job's last run and
+    runtime are stored in the maintenance_log table. A job that raises is
+    recorded as failed and retried after retry_seconds.
+    """
+
+    def __init__(self, database, idle_seconds: float = 30.0,
+                 history_retention_days: Optional[int] = None,
+                 archive_path: Optional[str] = None,
+                 intervals: Optional[Dict[str, float]] = None,
+                 vacuum_pages: int = 256, prune_batch: int = 2000,
+                 retry_seconds: float = 3600.0,
+                 report_callback: Optional[Callable[[MaintenanceResult], None]] = None):
+        """
+        Args:
+            database: Database to maintain
+            idle_seconds: Quiet time required before jobs run
+            history_retention_days: Review history older than this is pruned
+                                    (None to keep all history)
+            archive_path: SQLite file receiving pruned history (None to delete it)
+            intervals: Seconds between runs, overriding DEFAULT_INTERVALS
+            vacuum_pages: Free pages released per incremental vacuum step
+            prune_batch: Review history rows moved per pruning step
+            retry_seconds: Delay before a failed job runs again
+            report_callback: Called with the result of every finished job
+        """
+        self.db = database
+        self.idle_seconds = idle_seconds
+        self.history_retention_days = history_retention_days
+        self.archive_path = archive_path
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self.vacuum_pages = vacuum_pages
+        self.prune_batch = prune_batch
+        self.retry_seconds = retry_seconds
+        self.report_callback = report_callback
+
+        # Every job returns an iterator that yields progress after each step
+        # and returns its final detail. Jobs run in this order when several
+        # are due, so the vacuum releases the pages freed by pruning
+        self._jobs = {
+            'prune_history': self._prune_history,
+            'incremental_vacuum': self._incremental_vacuum,
+            'optimize': lambda: self._single_step(self._optimize),
+            'analyze': lambda: self._single_step(self._analyze),
+            'integrity_check': lambda: self._single_step(self._integrity_check),
+        }
+        self._vacuum_requested = False
+        self._running: Optional[str] = None
+        self._steps: Optional[Iterator[str]] = None
+        self._elapsed = 0.0
+        self._seen_changes = database.conn.total_changes
+        self._last_activity = time.monotonic()
+
+    # Idle detection
+    def notify_activity(self):
+        """Record foreground activity that did not write to the database"""
+        self._last_activity = time.monotonic()
+
+    def _foreground_wrote(self) -> bool:
+        changes = self.db.conn.total_changes
+        if changes != self._seen_changes:
+            self._seen_changes = changes
+            self._last_activity = time.monotonic()
+            return True
+        return False
+
+    def is_idle(self) -> bool:
+        """Check whether the database has been quiet for idle_seconds"""
+        self._foreground_wrote()
+        return time.monotonic() - self._last_activity >= self.idle_seconds
+
+    # Scheduling
+    def due_jobs(self) -> List[str]:
+        """Get the jobs whose interval has elapsed since their last run"""
+        cursor = self.db.conn.cursor()
+        cursor.execute("SELECT job, last_run, detail FROM maintenance_log")
+        intervals = dict(self.intervals)
+        last_runs = {}
+        for row in cursor.fetchall():
+            last_runs[row['job']] = row['last_run']
+            if row['job'] in intervals and (row['detail'] or '').startswith(FAILED_PREFIX):
+                intervals[row['job']] = min(intervals[row['job']], self.retry_seconds)
+        now = time.time()
+        return [
+            job for job in self._jobs
+            if (job != 'prune_history' or self.history_retention_days is not None)
+            and (now - last_runs.get(job, 0) >= intervals[job]
+                 or (job == 'incremental_vacuum' and self._vacuum_requested))
+        ]
+
+    def run_pending(self, budget: float = 0.2) -> List[MaintenanceResult]:
+        """
+        Run due jobs for at most `budget` seconds if the database is idle
+
+        Returns:
+            Results of the jobs that finished during this call
+        """
+        results = []
+        if not self.is_idle():
+            return results
+
+        deadline = time.monotonic() + budget
+        while time.monotonic() < deadline:
+            if self._steps is None:
+                due = self.due_jobs()
+                if not due:
+                    break
+                self._start(due[0])
+
+            result = self._step()
+            if result:
+                results.append(result)
+            if self._foreground_wrote():
+                break
+        return results
+
+    def run_job(self, job: str) -> MaintenanceResult:
+        """Run a job to completion, regardless of idleness and schedule"""
+        if self._running != job:
+            self._start(job)
+        result = None
+        while result is None:
+            result = self._step()
+        return result
+
+    def _start(self, job: str):
+        self._running = job
+        self._steps = self._jobs[job]()
+        self._elapsed = 0.0
+
+    def _step(self) -> Optional[MaintenanceResult]:
+        """Run one step of the current job, returning its result once done"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            detail = next(self._steps)
+            done = False
+        except StopIteration as stop:
+            detail = stop.value or ""
+            done = True
+        except Exception as error:
+            # The generator is dead, so the job restarts on its next run
+            if self.db.conn.in_transaction:
+                self.db.conn.rollback()
+            detail = f"{FAILED_PREFIX}{error}"
+            done = failed = True
+        self._elapsed += time.perf_counter() - start
+        self._seen_changes = self.db.conn.total_changes
+        if not done:
+            return None
+
+        result = MaintenanceResult(self._running, self._elapsed, detail, failed)
+        self._running = None
+        self._steps = None
+        self._record(result)
+        return result
+
+    def _record(self, result: MaintenanceResult):
+        cursor = self.db.conn.cursor()
+        cursor.execute(
+            """INSERT OR REPLACE INTO maintenance_log (job, last_run, duration, detail)
+               VALUES (?, ?, ?, ?)""",
+            (result.job, time.time(), result.duration, result.detail)
+        )
+        self.db.conn.commit()
+        self._seen_changes = self.db.conn.total_changes
+        if result.job == 'incremental_vacuum':
+            self._vacuum_requested = False
+        if self.report_callback:
+            self.report_callback(result)
+
+    def get_log(self) -> List[Dict]:
+        """Get the last run, runtime and outcome of every job"""
+        cursor = self.db.conn.cursor()
+        cursor.execute("SELECT * FROM maintenance_log ORDER BY job")
+        return [dict(row) for row in cursor.fetchall()]
+
+    # Jobs
+    @staticmethod
+    def _single_step(job: Callable[[], str]) -> Iterator[str]:
+        """Run a job that cannot be split as one step"""
+        return job()
+        yield  # Makes this function a generator
+
+    def _optimize(self) -> str:
+        self.db.conn.execute("PRAGMA optimize")
+        return "ok"
+
+    def _analyze(self) -> str:
+        self.db.conn.execute("ANALYZE")
+        self.db.conn.commit()
+        return "ok"
+
+    def _integrity_check(self) -> str:
+        rows = self.db.conn.execute("PRAGMA quick_check").fetchall()
+        return "; ".join(row[0] for row in rows)
+
+    def _incremental_vacuum(self) -> Iterator[str]:
+        conn = self.db.conn
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Databases created before incremental vacuum need one full VACUUM
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return "converted to incremental auto_vacuum"
+
+        released = 0
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages:
+            # execute() only steps the pragma once, freeing a single page;
+            # executescript() runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break
+            released += free_pages - remaining
+            free_pages = remaining
+            yield f"released {released} pages"
+        return f"released {released} pages"
+
+    def _prune_history(self) -> Iterator[str]:
+        conn = self.db.conn
+        cutoff = self.db.clock.today() - self.history_retention_days
+        if self.archive_path:
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+
+        moved = 0
+        try:
+            if self.archive_path:
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS archive.review_history (
+                           id INTEGER PRIMARY KEY,
+                           card_id INTEGER NOT NULL,
+                           quality INTEGER NOT NULL,
+                           reviewed_at TIMESTAMP,
+                           time_spent INTEGER,
+                           review_day INTEGER
+                       )"""
+                )
+            while True:
+                ids = [row[0] for row in conn.execute(
+                    "SELECT id FROM review_history WHERE review_day < ? ORDER BY id LIMIT ?",
+                    (cutoff, self.prune_batch)
+                )]
+                if not ids:
+                    break
+                placeholders = ', '.join('?' * len(ids))
+                with conn:
+                    if self.archive_path:
+                        conn.execute(
+                            f"""INSERT OR IGNORE INTO archive.review_history
+                                (id, card_id, quality, reviewed_at, time_spent, review_day)
+                                SELECT id, card_id, quality, reviewed_at, time_spent, review_day
+                                FROM main.review_history WHERE id IN ({placeholders})""",
+                            ids
+                        )
+                    conn.execute(
+                        f"DELETE FROM main.review_history WHERE id IN ({placeholders})", ids
+                    )
+                moved += len(ids)
+                # Release the freed pages without waiting for the next vacuum
+                self._vacuum_requested = True
+                yield f"pruned {moved} reviews"
+        finally:
+            if self.archive_path:
+                conn.execute("DETACH DATABASE archive")
+        return f"pruned {moved} reviews"
@@ -0,0 +1,316 @@
+"""Content-addressed media attachments for StudyCards-Pro"""
+
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+CARD_FIELDS = ('question', 'answer', 'example')
+
+_REFERENCE_RE = re.compile(r'\[media:([0-9a-f]{64})\]')
+_DATA_URI_RE = re.compile(r'data:(?P<mime>[\w.+-]+/[\w.+-]+);base64,(?P<data>[A-Za-z0-9+/]+={0,2})')
+# A following line of a wrapped base64 payload: only base64 up to the end of
+# the line, so ordinary text after a data URI is never taken as payload
+_DATA_LINE_RE = re.compile(r'[ \t]*\r?\n[ \t]*([A-Za-z0-9+/]+={0,2})(?=[ \t]*(?:\r?\n|$))')
+# Narrowest line width used when wrapping base64 (PEM uses 64, MIME 76)
+_MIN_WRAP_WIDTH = 60
+
+
+class MediaStore:
+    """
+    Stores images and audio attached to cards
+
+    Files are kept on disk under the SHA-256 of their content, so identical
+    media is stored once. Card fields only hold '[media:<hash>]' references;
+    the card_media table links cards to media and a trigger maintains each
+    file's reference count, which gc() uses to delete unused files. Loaded
+    content is kept in an LRU cache bounded by size.
+    """
+
+    def __init__(self, database, media_dir: Optional[str] = None,
+                 cache_bytes: int = 32 * 1024 * 1024):
+        self.db = database
+        if media_dir is None:
+            media_dir = f"{Path(database.db_path).with_suffix('')}.media"
+        self.media_dir = Path(media_dir)
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_size = 0
+
+    # References
+    @staticmethod
+    def reference(media_hash: str) -> str:
+        """Get the text used to reference media from a card field"""
+        return f"[media:{media_hash}]"
+
+    @staticmethod
+    def find_references(text: str) -> List[str]:
+        """Get the media hashes referenced by a field, in order"""
+        return _REFERENCE_RE.findall(text or '')
+
+    def path_of(self, media_hash: str) -> Path:
+        """Get the file path of stored media"""
+        return self.media_dir / media_hash[:2] / media_hash
+
+    # Storing media
+    def add_bytes(self, data: bytes, mime: str = 'application/octet-stream',
+                  filename: str = "", card_id: Optional[int] = None,
+                  field: str = 'question') -> str:
+        """
+        Store media content
+
+        Unlinked media is kept by gc() for grace_seconds, long enough to save
+        the card referencing it. Pass card_id to link it in the same
+        transaction instead.
+
+        Args:
+            data: File content
+            mime: MIME type of the content
+            filename: Original file name, kept for display
+            card_id: Card to link the media to (None to leave it unlinked)
+            field: Card field the media belongs to
+
+        Returns:
+            Hash identifying the media
+        """
+        with self.db.conn:
+            media_hash = self._store_bytes(data, mime, filename)
+            if card_id is not None:
+                self.db.conn.execute(
+                    "INSERT OR IGNORE INTO card_media (card_id, media_hash, field) VALUES (?, ?, ?)",
+                    (card_id, media_hash, field)
+                )
+        return media_hash
+
+    def _store_bytes(self, data: bytes, mime: str, filename: str = "") -> str:
+        """Write media to disk and insert its row in the caller's transaction"""
+        media_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_of(media_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        self.db.conn.execute(
+            "INSERT OR IGNORE INTO media (hash, mime, size, filename) VALUES (?, ?, ?, ?)",
+            (media_hash, mime, len(data), filename)
+        )
+        return media_hash
+
+    def add_file(self, filepath: str, card_id: Optional[int] = None,
+                 field: str = 'question') -> str:
+        """Store a media file from disk, optionally linking it to a card"""
+        mime = mimetypes.guess_type(filepath)[0] or 'application/octet-stream'
+        with open(filepath, 'rb') as f:
+            return self.add_bytes(f.read(), mime, os.path.basename(filepath), card_id, field)
+
+    # Card links
+    def attach(self, card_id: int, media_hash: str, field: str = 'question'):
+        """Link media to a card field"""
+        cursor = self.db.conn.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO card_media (card_id, media_hash, field) VALUES (?, ?, ?)",
+            (card_id, media_hash, field)
+        )
+        self.db.conn.commit()
+
+    def detach(self, card_id: int, media_hash: str, field: Optional[str] = None):
+        """Unlink media from a card, from every field if none is given"""
+        cursor = self.db.conn.cursor()
+        if field:
+            cursor.execute(
+                "DELETE FROM card_media WHERE card_id = ? AND media_hash = ? AND field = ?",
+                (card_id, media_hash, field)
+            )
+        else:
+            cursor.execute(
+                "DELETE FROM card_media WHERE card_id = ? AND media_hash = ?",
+                (card_id, media_hash)
+            )
+        self.db.conn.commit()
+
+    def sync_card(self, card_id: int):
+        """Update a card's media links to match the references in its fields"""
+        with self.db.conn:
+            self.db.sync_card_media(card_id)
+
+    def get_card_media(self, card_id: int) -> List[Dict]:
+        """Get references to the media of a card, without loading content"""
+        cursor = self.db.conn.cursor()
+        cursor.execute(
+            """SELECT m.hash, m.mime, m.size, m.filename, cm.field
+               FROM card_media cm JOIN media m ON m.hash = cm.media_hash
+               WHERE cm.card_id = ?
+               ORDER BY cm.field, m.hash""",
+            (card_id,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    # Loading
+    def load(self, media_hash: str) -> bytes:
+        """
+        Load media content, going through the LRU cache
+
+        Args:
+            media_hash: Hash identifying the media
+
+        Returns:
+            File content
+        """
+        data = self._cache.get(media_hash)
+        if data is not None:
+            self._cache.move_to_end(media_hash)
+            return data
+
+        with open(self.path_of(media_hash), 'rb') as f:
+            data = f.read()
+
+        if len(data) <= self.cache_bytes:
+            self._cache[media_hash] = data
+            self._cached_size += len(data)
+            while self._cached_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_size -= len(evicted)
+        return data
+
+    def load_card_media(self, card: Dict) -> Dict[str, bytes]:
+        """Load the media referenced by a card's fields when it is displayed"""
+        return {
+            media_hash: self.load(media_hash)
+            for field in CARD_FIELDS
+            for media_hash in self.find_references(card.get(field))
+        }
+
+    # Housekeeping
+    def gc(self, grace_seconds: int = 3600) -> int:
+        """
+        Delete media no longer referenced by any card
+
+        Links missing for references in card fields are restored first, so
+        cards written without going through Database still keep their media.
+
+        Args:
+            grace_seconds: Minimum age of unreferenced media before removal,
+                           protecting media added for a card not saved yet
+
+        Returns:
+            Number of media files removed
+        """
+        cursor = self.db.conn.cursor()
+        with self.db.conn:
+            cursor.execute(
+                "DELETE FROM card_media WHERE card_id NOT IN (SELECT id FROM cards)"
+            )
+            cursor.execute(
+                """SELECT id FROM cards WHERE question LIKE '%[media:%'
+                   OR answer LIKE '%[media:%' OR example LIKE '%[media:%'"""
+            )
+            for row in cursor.fetchall():
+                self.db.sync_card_media(row['id'], remove_stale=False)
+            cursor.execute(
+                """SELECT hash FROM media
+                   WHERE ref_count <= 0 AND created_at <= datetime('now', ?)""",
+                (f"-{int(grace_seconds)} seconds",)
+            )
+            unused = [row['hash'] for row in cursor.fetchall()]
+            cursor.executemany("DELETE FROM media WHERE hash = ?", [(h,) for h in unused])
+
+        for media_hash in unused:
+            cached = self._cache.pop(media_hash, None)
+            if cached is not None:
+                self._cached_size -= len(cached)
+            try:
+                os.remove(self.path_of(media_hash))
+            except FileNotFoundError:
+                pass
+        return len(unused)
+
+    def extract_inline_media(self, batch_size: int = 200) -> int:
+        """
+        Move base64 data URIs pasted into card fields to the media store
+
+        Each data URI is replaced by a media reference and linked to the card.
+        Payloads wrapped over several lines are joined when every line but
+        the last has the same width; data URIs that do not decode are left
+        in place.
+
+        Args:
+            batch_size: Number of cards rewritten per transaction
+
+        Returns:
+            Number of cards rewritten
+        """
+        cursor = self.db.conn.cursor()
+        rewritten = 0
+        last_id = 0
+        while True:
+            cursor.execute(
+                """SELECT id, question, answer, example FROM cards
+                   WHERE id > ? AND (question LIKE '%;base64,%' OR answer LIKE '%;base64,%'
+                                     OR example LIKE '%;base64,%')
+                   ORDER BY id LIMIT ?""",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return rewritten
+
+            for row in rows:
+                fields = {field: self._extract_field(row[field]) for field in CARD_FIELDS}
+                if all(text == row[field] for field, text in fields.items()):
+                    continue
+                self.db.conn.execute(
+                    "UPDATE cards SET question = ?, answer = ?, example = ? WHERE id = ?",
+                    (fields['question'], fields['answer'], fields['example'], row['id'])
+                )
+                self.db.sync_card_media(row['id'], fields)
+                rewritten += 1
+            self.db.conn.commit()
+            last_id = rows[-1]['id']
+
+    def _extract_field(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return text
+
+        parts = []
+        position = 0
+        for match in _DATA_URI_RE.finditer(text):
+            if match.start() < position:
+                continue
+            payload, end = self._wrapped_payload(text, match)
+            try:
+                data = base64.b64decode(payload + '=' * (-len(payload) % 4), validate=True)
+            except (binascii.Error, ValueError):
+                continue
+            media_hash = self._store_bytes(data, match.group('mime'))
+            parts.append(text[position:match.start()])
+            parts.append(self.reference(media_hash))
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts)
+
+    @staticmethod
+    def _wrapped_payload(text: str, match) -> Tuple[str, int]:
+        """Get a data URI's base64 payload and end, following wrapped lines"""
+        payload = match.group('data')
+        end = match.end()
+        width = len(payload)
+        if width < _MIN_WRAP_WIDTH or width % 4 or payload.endswith('='):
+            return payload, end
+        while True:
+            line = _DATA_LINE_RE.match(text, end)
+            if not line or len(line.group(1)) > width:
+                return payload, end
+            payload += line.group(1)
+            end = line.end()
+            if len(line.group(1)) < width or payload.endswith('='):
+                return payload, end
@@ -65,6 +65,7 @@ class Card:
     interval: int = 0
     repetitions: int = 0
     next_review: Optional[str] = None
+    next_review_day: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
@@ -82,6 +83,7 @@ class Card:
             interval=data.get('interval', 0),
             repetitions=data.get('repetitions', 0),
             next_review=data.get('next_review'),
+            next_review_day=data.get('next_review_day'),
             created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else None,
             updated_at=datetime.fromisoformat(data['updated_at']) if data.get('updated_at') else None
         )
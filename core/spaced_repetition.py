@@ -1,7 +1,10 @@
 """Spaced Repetition Algorithm (SuperMemo 2) Implementation"""
 
 from datetime import datetime, timedelta
-from typing import Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .day_clock import DayClock
 
 
 class SpacedRepetitionEngine:
@@ -9,7 +12,7 @@ class SpacedRepetitionEngine:
     
     @staticmethod
     def calculate_next_review(ease_factor: float, interval: int, repetitions: int, 
-                              quality: int) -> Tuple[float, int, int, str]:
+                              quality: int, today: Optional[int] = None) -> Tuple[float, int, int, str]:
         """
         Calculate next review parameters based on SM-2 algorithm
         
@@ -24,45 +27,64 @@ class SpacedRepetitionEngine:
                      3 = Correct with difficulty
                      4 = Correct with hesitation
                      5 = Perfect recall
+            today: Current study day number (see DayClock); defaults to
+                   the local calendar date
         
         Returns:
             Tuple of (new_ease_factor, new_interval, new_repetitions, next_review_date)
         """
         
+        ease_factor, new_interval, new_repetitions = SpacedRepetitionEngine.calculate_schedule(
+            ease_factor, interval, repetitions, quality
+        )
+        
+        # Calculate next review date
+        if today is not None:
+            next_review_str = DayClock.date_of_day(today + new_interval)
+        else:
+            next_review = datetime.now() + timedelta(days=new_interval)
+            next_review_str = next_review.strftime('%Y-%m-%d')
+        
+        return (ease_factor, new_interval, new_repetitions, next_review_str)
+    
+    @staticmethod
+    def calculate_schedule(ease_factor: float, interval: int, repetitions: int,
+                           quality: int) -> Tuple[float, int, int]:
+        """
+        Calculate new SM-2 scheduling state without resolving a review date
+        
+        Args:
+            ease_factor: Current ease factor
+            interval: Current interval in days
+            repetitions: Number of consecutive correct repetitions
+            quality: Quality of response (0-5)
+        
+        Returns:
+            Tuple of (new_ease_factor, new_interval, new_repetitions)
+        """
         # Quality must be between 0 and 5
         quality = max(0, min(5, quality))
         
         # If quality is less than 3, reset the repetitions
         if quality < 3:
-            new_repetitions = 0
-            new_interval = 1
-        else:
-            # Update ease factor
-            new_ease_factor = ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-            new_ease_factor = max(1.3, new_ease_factor)  # Minimum ease factor is 1.3
-            
-            # Calculate new interval
-            if repetitions == 0:
-                new_interval = 1
-                new_repetitions = 1
-            elif repetitions == 1:
-                new_interval = 6
-                new_repetitions = 2
-            else:
-                new_interval = round(interval * new_ease_factor)
-                new_repetitions = repetitions + 1
-            
-            ease_factor = new_ease_factor
+            return (ease_factor, 1, 0)
         
-        if quality < 3:
-            new_repetitions = 0
-            new_interval = 1
+        # Update ease factor
+        new_ease_factor = ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        new_ease_factor = max(1.3, new_ease_factor)  # Minimum ease factor is 1.3
         
-        # Calculate next review date
-        next_review = datetime.now() + timedelta(days=new_interval)
-        next_review_str = next_review.strftime('%Y-%m-%d')
+        # Calculate new interval
+        if repetitions == 0:
+            new_interval = 1
+            new_repetitions = 1
+        elif repetitions == 1:
+            new_interval = 6
+            new_repetitions = 2
+        else:
+            new_interval = round(interval * new_ease_factor)
+            new_repetitions = repetitions + 1
         
-        return (ease_factor, new_interval, new_repetitions, next_review_str)
+        return (new_ease_factor, new_interval, new_repetitions)
     
     @staticmethod
     def get_quality_from_button(button_index: int) -> int:
@@ -84,6 +106,7 @@ class SpacedRepetitionEngine:
         return quality_map.get(button_index, 4)
     
     @staticmethod
+    @lru_cache(maxsize=1024)
     def get_interval_text(interval: int) -> str:
         """
         Get human-readable text for interval
@@ -123,13 +146,96 @@ class SpacedRepetitionEngine:
         Returns:
             Dictionary with intervals for each button
         """
-        intervals = {}
+        return _default_preview_engine.preview(ease_factor, interval, repetitions)
+
+
+class IntervalPreviewEngine:
+    """
+    Memoized interval previews for the answer buttons
+    
+    Previews only depend on a small discrete scheduling state: below two
+    repetitions the interval is fixed, and from then on it only depends on
+    the current interval and the ease factor. Previews are computed once per
+    quantized state and kept in an LRU cache, so the study UI and any other
+    caller share the same table.
+    """
+    
+    def __init__(self, cache_size: int = 8192, ease_precision: int = 3):
+        self.ease_precision = ease_precision
+        self._lookup = lru_cache(maxsize=cache_size)(self._compute)
+    
+    def _key(self, ease_factor: float, interval: int, repetitions: int) -> Tuple[float, int, int]:
+        if repetitions < 2:
+            return (0.0, 0, max(0, repetitions))
+        return (round(ease_factor, self.ease_precision), interval, 2)
+    
+    @staticmethod
+    def _compute(ease_factor: float, interval: int, repetitions: int) -> Tuple[Tuple[int, ...], Tuple[str, ...]]:
+        days = tuple(
+            SpacedRepetitionEngine.calculate_schedule(
+                ease_factor, interval, repetitions,
+                SpacedRepetitionEngine.get_quality_from_button(button_idx)
+            )[1]
+            for button_idx in range(4)
+        )
+        return (days, tuple(SpacedRepetitionEngine.get_interval_text(day) for day in days))
+    
+    def preview(self, ease_factor: float, interval: int, repetitions: int) -> dict:
+        """
+        Get preview interval texts for each button
+        
+        Args:
+            ease_factor: Current ease factor
+            interval: Current interval
+            repetitions: Current repetitions
+        
+        Returns:
+            Dictionary with interval text for each button
+        """
+        _, texts = self._lookup(*self._key(ease_factor, interval, repetitions))
+        return dict(enumerate(texts))
+    
+    def preview_days(self, ease_factor: float, interval: int, repetitions: int) -> Tuple[int, ...]:
+        """
+        Get preview intervals in days for each button
         
-        for button_idx in range(4):
-            quality = SpacedRepetitionEngine.get_quality_from_button(button_idx)
-            _, new_interval, _, _ = SpacedRepetitionEngine.calculate_next_review(
-                ease_factor, interval, repetitions, quality
-            )
-            intervals[button_idx] = SpacedRepetitionEngine.get_interval_text(new_interval)
+        Returns:
+            Tuple of intervals indexed by button
+        """
+        days, _ = self._lookup(*self._key(ease_factor, interval, repetitions))
+        return days
+    
+    def preview_batch(self, cards: List[Dict]) -> Dict[int, dict]:
+        """
+        Get button previews for a batch of cards
         
-        return intervals
+        Args:
+            cards: Card dictionaries with id, ease_factor, interval and repetitions
+        
+        Returns:
+            Dictionary mapping card id to its button previews
+        """
+        lookup = self._lookup
+        key = self._key
+        return {
+            card['id']: dict(enumerate(lookup(*key(
+                card['ease_factor'], card['interval'], card['repetitions']
+            ))[1]))
+            for card in cards
+        }
+    
+    def cache_info(self):
+        """Get hit/miss statistics of the preview cache"""
+        return self._lookup.cache_info()
+    
+    def clear(self):
+        """Drop every cached preview"""
+        self._lookup.cache_clear()
+
+
+_default_preview_engine = IntervalPreviewEngine()
+
+
+def default_preview_engine() -> IntervalPreviewEngine:
+    """Get the preview engine shared by get_button_intervals"""
+    return _default_preview_engine
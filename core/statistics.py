@@ -1,9 +1,47 @@
 """Statistics and analytics for StudyCards-Pro"""
 
-from typing import Dict, List, Tuple
-from datetime import datetime, timedelta
+import json
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 from collections import defaultdict
 
+from .database import Database
+from .day_clock import DayClock
+
+
+# get_study_streak only looks at the last 100 study days
+MAX_STREAK_DAYS = 100
+
+# Days of review history covered by the weekly heatmap
+HEATMAP_DAYS = 84
+
+
+@dataclass
+class DashboardSnapshot:
+    """Every statistic shown by the statistics panel, computed together"""
+    generated_at: str
+    today: int
+    daily_stats: List[Dict] = field(default_factory=list)
+    category_distribution: List[Dict] = field(default_factory=list)
+    success_rate: float = 0.0
+    study_streak: int = 0
+    cards_due_today: int = 0
+    mastery_level: Dict[str, int] = field(default_factory=dict)
+    difficult_cards: List[Dict] = field(default_factory=list)
+    total_study_time: int = 0
+    weekly_heatmap: List[Tuple[str, int]] = field(default_factory=list)
+    
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+    
+    @classmethod
+    def from_json(cls, data: str) -> 'DashboardSnapshot':
+        snapshot = cls(**json.loads(data))
+        snapshot.weekly_heatmap = [tuple(entry) for entry in snapshot.weekly_heatmap]
+        return snapshot
+
 
 class StatisticsEngine:
     """Provides statistical analysis of study progress"""
@@ -21,24 +59,18 @@ class StatisticsEngine:
         Returns:
             List of daily statistics
         """
-        stats = self.db.get_review_stats(days)
+        stats = {stat['date']: stat for stat in self.db.get_review_stats(days)}
         
         # Fill in missing days with zero counts
+        today = self.db.clock.today()
         result = []
         for i in range(days):
-            date = (datetime.now() - timedelta(days=days-i-1)).strftime('%Y-%m-%d')
-            found = False
-            for stat in stats:
-                if stat['date'] == date:
-                    result.append(stat)
-                    found = True
-                    break
-            if not found:
-                result.append({
-                    'date': date,
-                    'count': 0,
-                    'avg_quality': 0
-                })
+            date = DayClock.date_of_day(today - days + i + 1)
+            result.append(stats.get(date, {
+                'date': date,
+                'count': 0,
+                'avg_quality': 0
+            }))
         
         return result
     
@@ -76,8 +108,8 @@ class StatisticsEngine:
             SELECT 
                 COUNT(CASE WHEN quality >= 3 THEN 1 END) * 100.0 / COUNT(*) as rate
             FROM review_history
-            WHERE reviewed_at >= date('now', '-' || ? || ' days')
-        """, (days,))
+            WHERE review_day > ?
+        """, (self.db.clock.today() - days,))
         
         result = cursor.fetchone()
         return round(result['rate'], 1) if result and result['rate'] else 0.0
@@ -91,25 +123,25 @@ class StatisticsEngine:
         """
         cursor = self.db.conn.cursor()
         cursor.execute("""
-            SELECT DISTINCT DATE(reviewed_at) as date
+            SELECT DISTINCT review_day
             FROM review_history
-            ORDER BY date DESC
+            WHERE review_day IS NOT NULL
+            ORDER BY review_day DESC
             LIMIT 100
         """)
         
-        dates = [row['date'] for row in cursor.fetchall()]
-        if not dates:
+        days = [row['review_day'] for row in cursor.fetchall()]
+        if not days:
             return 0
         
         streak = 0
-        check_date = datetime.now().date()
+        check_day = self.db.clock.today()
         
-        for date_str in dates:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            if date == check_date:
+        for day in days:
+            if day == check_day:
                 streak += 1
-                check_date -= timedelta(days=1)
-            elif date < check_date:
+                check_day -= 1
+            elif day < check_day:
                 break
         
         return streak
@@ -121,8 +153,7 @@ class StatisticsEngine:
         Returns:
             Number of due cards
         """
-        due_cards = self.db.get_due_cards()
-        return len(due_cards)
+        return self.db.count_due_cards()
     
     def get_mastery_level(self) -> Dict[str, int]:
         """
@@ -186,8 +217,8 @@ class StatisticsEngine:
         cursor.execute("""
             SELECT SUM(time_spent) as total
             FROM review_history
-            WHERE reviewed_at >= date('now', '-' || ? || ' days')
-        """, (days,))
+            WHERE review_day > ?
+        """, (self.db.clock.today() - days,))
         
         result = cursor.fetchone()
         total_seconds = result['total'] if result and result['total'] else 0
@@ -202,11 +233,162 @@ class StatisticsEngine:
         """
         cursor = self.db.conn.cursor()
         cursor.execute("""
-            SELECT DATE(reviewed_at) as date, COUNT(*) as count
+            SELECT review_day, COUNT(*) as count
             FROM review_history
-            WHERE reviewed_at >= date('now', '-84 days')
-            GROUP BY DATE(reviewed_at)
-            ORDER BY date
-        """)
+            WHERE review_day > ?
+            GROUP BY review_day
+            ORDER BY review_day
+        """, (self.db.clock.today() - HEATMAP_DAYS,))
+        
+        return [(DayClock.date_of_day(row['review_day']), row['count']) for row in cursor.fetchall()]
+
+    
+    # Dashboard
+    def get_dashboard_snapshot(self, daily_days: int = 7, rate_days: int = 30,
+                               difficult_limit: int = 10) -> DashboardSnapshot:
+        """
+        Compute every dashboard statistic in five queries
+        
+        Gives the same values as calling the individual get_* methods with
+        their default arguments: one pass over cards, a per-day count of the
+        heatmap window, a per-day aggregate of the shorter rate window, and
+        the category and difficult card queries. The streak comes from the
+        heatmap counts and only needs an extra query when it spans them all.
+        
+        Args:
+            daily_days: Number of days in daily_stats
+            rate_days: Number of days for success_rate and total_study_time
+            difficult_limit: Maximum number of difficult cards
+        
+        Returns:
+            Dashboard snapshot
+        """
+        today = self.db.clock.today()
+        cursor = self.db.conn.cursor()
+        
+        cursor.execute("""
+            SELECT
+                COUNT(CASE WHEN next_review_day IS NULL OR next_review_day <= ? THEN 1 END) as due,
+                COUNT(CASE WHEN repetitions = 0 THEN 1 END) as new,
+                COUNT(CASE WHEN repetitions BETWEEN 1 AND 2 THEN 1 END) as learning,
+                COUNT(CASE WHEN repetitions BETWEEN 3 AND 5 THEN 1 END) as young,
+                COUNT(CASE WHEN repetitions > 5 THEN 1 END) as mature
+            FROM cards
+        """, (today,))
+        cards = cursor.fetchone()
+        
+        cursor.execute("""
+            SELECT review_day, COUNT(*) as count
+            FROM review_history
+            WHERE review_day > ?
+            GROUP BY review_day
+        """, (today - HEATMAP_DAYS,))
+        heatmap = {row['review_day']: row['count'] for row in cursor.fetchall()}
+        
+        cursor.execute("""
+            SELECT review_day, COUNT(*) as count, AVG(quality) as avg_quality,
+                   COUNT(CASE WHEN quality >= 3 THEN 1 END) as passed,
+                   SUM(time_spent) as time_spent
+            FROM review_history
+            WHERE review_day > ?
+            GROUP BY review_day
+        """, (today - max(daily_days, rate_days),))
+        days = {row['review_day']: row for row in cursor.fetchall()}
+        
+        daily_stats = []
+        for day in range(today - daily_days + 1, today + 1):
+            row = days.get(day)
+            daily_stats.append({
+                'date': DayClock.date_of_day(day),
+                'count': row['count'] if row else 0,
+                'avg_quality': row['avg_quality'] if row else 0
+            })
+        
+        recent = [row for day, row in days.items() if day > today - rate_days]
+        reviewed = sum(row['count'] for row in recent)
+        passed = sum(row['passed'] for row in recent)
+        seconds = sum(row['time_spent'] or 0 for row in recent)
+        
+        return DashboardSnapshot(
+            generated_at=datetime.now().isoformat(timespec='seconds'),
+            today=today,
+            daily_stats=daily_stats,
+            category_distribution=self.get_category_distribution(),
+            success_rate=round(passed * 100.0 / reviewed, 1) if passed else 0.0,
+            study_streak=self._streak_from(heatmap, today),
+            cards_due_today=cards['due'],
+            mastery_level={level: cards[level] for level in ('new', 'learning', 'young', 'mature')},
+            difficult_cards=self.get_difficult_cards(difficult_limit),
+            total_study_time=round(seconds / 60),
+            weekly_heatmap=[(DayClock.date_of_day(day), heatmap[day]) for day in sorted(heatmap)]
+        )
+    
+    def _streak_from(self, heatmap: Dict[int, int], today: int) -> int:
+        """Count the study streak from per-day counts of the heatmap window"""
+        streak = 0
+        while today - streak in heatmap:
+            streak += 1
+        if streak < HEATMAP_DAYS:
+            return streak
+        
+        cursor = self.db.conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT review_day
+            FROM review_history
+            WHERE review_day > ? AND review_day <= ?
+        """, (today - MAX_STREAK_DAYS, today - HEATMAP_DAYS))
+        older = {row['review_day'] for row in cursor.fetchall()}
+        while today - streak in older:
+            streak += 1
+        return streak
+    
+    def save_dashboard_snapshot(self, snapshot: DashboardSnapshot):
+        """Persist a snapshot so the next start can show it immediately"""
+        cursor = self.db.conn.cursor()
+        cursor.execute(
+            """INSERT OR REPLACE INTO dashboard_snapshot (id, generated_at, data)
+               VALUES (1, ?, ?)""",
+            (snapshot.generated_at, snapshot.to_json())
+        )
+        self.db.conn.commit()
+    
+    def load_dashboard_snapshot(self) -> Optional[DashboardSnapshot]:
+        """Get the last persisted snapshot, if any"""
+        cursor = self.db.conn.cursor()
+        cursor.execute("SELECT data FROM dashboard_snapshot WHERE id = 1")
+        row = cursor.fetchone()
+        return DashboardSnapshot.from_json(row['data']) if row else None
+    
+    def refresh_dashboard_in_background(
+            self, callback: Optional[Callable[[DashboardSnapshot], None]] = None
+    ) -> threading.Thread:
+        """
+        Compute and persist a snapshot on a background thread
+        
+        The thread uses its own connection, so the caller's connection stays
+        free. The callback runs on the background thread.
+        
+        Args:
+            callback: Called with the new snapshot once it is saved
+        
+        Returns:
+            The started thread
+        """
+        if self.db.db_path == ':memory:':
+            raise ValueError("Background refresh needs a database file")
+        
+        def refresh():
+            database = Database(self.db.db_path, self.db.clock)
+            database.connect()
+            try:
+                engine = StatisticsEngine(database)
+                snapshot = engine.get_dashboard_snapshot()
+                engine.save_dashboard_snapshot(snapshot)
+            finally:
+                database.close()
+            if callback:
+                callback(snapshot)
         
-        return [(row['date'], row['count']) for row in cursor.fetchall()]
+        thread = threading.Thread(target=refresh, name='studycards-dashboard', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,365 @@
+"""Headless study session engine for StudyCards-Pro"""
+
+import contextlib
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .day_clock import DayClock
+from .load_balancer import LoadBalancer
+from .spaced_repetition import IntervalPreviewEngine, SpacedRepetitionEngine, default_preview_engine
+
+
+def _try_lock(f) -> bool:
+    """Take a non-blocking exclusive lock on an open file, held until it is closed"""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _remove(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class StudySession:
+    """
+    Drives a study session without any GUI dependency
+
+    The next cards are prefetched together with their button interval
+    previews, so moving to the next card never waits on the database.
+    With a LoadBalancer, new intervals are fuzzed towards the least loaded
+    day. Answers go into a write-behind buffer that is written to the database
+    in one transaction once it is full or old enough. Every buffered answer
+    is first appended to a journal file, which is replayed on the next start
+    if the application stopped before the buffer was flushed.
+
+    Every session writes its own journal, '<journal_path>-<id>', and holds
+    an exclusive lock on it while open. Starting a session only replays
+    journals nobody holds a lock on, so several sessions may study the same
+    database at once.
+
+    Journal appends reach the OS immediately, so they survive an application
+    crash, but are only fsynced once per sync_interval (group commit) to keep
+    fsync off the per-answer path. A power loss can therefore lose the
+    answers of the last sync_interval seconds; use sync_interval=0 to fsync
+    every answer.
+
+    All public methods are guarded by a reentrant lock, so callbacks
+    triggered from inside the session may call back into it.
+    """
+
+    def __init__(self, database, deck_id: Optional[int] = None, prefetch: int = 10,
+                 flush_size: int = 20, flush_interval: float = 5.0,
+                 journal_path: Optional[str] = None,
+                 preview_engine: Optional[IntervalPreviewEngine] = None,
+                 load_balancer: Optional[LoadBalancer] = None,
+                 sync_interval: float = 1.0):
+        self.db = database
+        self.deck_id = deck_id
+        self.prefetch = max(1, prefetch)
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.sync_interval = sync_interval
+        self.preview_engine = preview_engine or default_preview_engine()
+        self.load_balancer = load_balancer
+        self.journal_path = journal_path or f"{database.db_path}.session-journal"
+        if database.db_path == ':memory:' and journal_path is None:
+            self.journal_path = None
+        self.journal_file: Optional[str] = None
+
+        self._lock = threading.RLock()
+        self._queue = deque()
+        self._seen = set()
+        self._buffer: List[Dict] = []
+        self._journal = None
+        self._exhausted = False
+        self._last_flush = time.monotonic()
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+        self.reviewed_count = 0
+
+    # Session lifecycle
+    def start(self) -> int:
+        """
+        Start the session, replaying journals left by interrupted sessions first
+
+        Returns:
+            Number of reviews recovered from the journals
+        """
+        with self._lock:
+            recovered = 0
+            if self.journal_path:
+                self._open_journal()
+                recovered = self.recover_orphaned_journals(self.db, self.journal_path)
+            self._last_flush = time.monotonic()
+            self._fill_queue()
+            return recovered
+
+    def close(self):
+        """Flush pending answers and release the journal"""
+        with self._lock:
+            self.flush()
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+                _remove(self.journal_file)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Cards
+    def current_card(self) -> Optional[Dict]:
+        """
+        Get the card being studied
+
+        Returns:
+            Card dictionary with a 'button_intervals' entry, or None when
+            no due cards are left
+        """
+        with self._lock:
+            if not self._queue:
+                self._fill_queue()
+            return self._queue[0] if self._queue else None
+
+    def remaining(self) -> int:
+        """Get the number of prefetched cards left in the queue"""
+        with self._lock:
+            return len(self._queue)
+
+    def is_finished(self) -> bool:
+        """Check whether every due card has been answered"""
+        return self.current_card() is None
+
+    def answer(self, button_index: int, time_spent: int = 0) -> Dict:
+        """
+        Answer the current card
+
+        Args:
+            button_index: 0 = Again, 1 = Hard, 2 = Good, 3 = Easy
+            time_spent: Seconds spent on the card
+
+        Returns:
+            The buffered review with the card's new scheduling data
+        """
+        with self._lock:
+            card = self.current_card()
+            if card is None:
+                raise RuntimeError("No card left to answer in this session")
+
+            quality = SpacedRepetitionEngine.get_quality_from_button(button_index)
+            today = self.db.clock.today()
+            ease_factor, interval, repetitions, next_review = (
+                SpacedRepetitionEngine.calculate_next_review(
+                    card['ease_factor'], card['interval'], card['repetitions'], quality, today
+                )
+            )
+            if self.load_balancer:
+                interval = self.load_balancer.schedule(interval, today, card['next_review_day'])
+                next_review = DayClock.date_of_day(today + interval)
+            review = {
+                'card_id': card['id'],
+                'quality': quality,
+                'time_spent': time_spent,
+                'reviewed_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                'ease_factor': ease_factor,
+                'interval': interval,
+                'repetitions': repetitions,
+                'next_review': next_review
+            }
+
+            self._write_journal(review)
+            self._buffer.append(review)
+            self._queue.popleft()
+            self.reviewed_count += 1
+
+            if len(self._buffer) >= self.flush_size:
+                self.flush()
+            else:
+                self.tick()
+            if len(self._queue) <= self.prefetch // 2:
+                self._fill_queue()
+            return review
+
+    # Write-behind buffer
+    def pending(self) -> int:
+        """Get the number of answers not yet written to the database"""
+        with self._lock:
+            return len(self._buffer)
+
+    def tick(self) -> int:
+        """
+        Flush the buffer if it is older than flush_interval and fsync the
+        journal if it is older than sync_interval
+
+        Meant to be called periodically, e.g. from a GUI timer.
+
+        Returns:
+            Number of reviews written
+        """
+        with self._lock:
+            if self._unsynced and time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_journal()
+            if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+                return self.flush()
+            return 0
+
+    def flush(self) -> int:
+        """
+        Write every buffered answer to the database
+
+        Returns:
+            Number of reviews written
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return 0
+            count = len(self._buffer)
+            self.db.apply_review_batch(self._buffer)
+            self._buffer = []
+            if self._journal:
+                self._journal.seek(0)
+                self._journal.truncate()
+                self._unsynced = False
+            return count
+
+    def _write_journal(self, review: Dict):
+        if not self._journal:
+            return
+        self._journal.write(json.dumps(review) + '\n')
+        self._journal.flush()
+        self._unsynced = True
+
+    def _sync_journal(self):
+        if self._journal:
+            os.fsync(self._journal.fileno())
+        self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def _open_journal(self):
+        while True:
+            path = f"{self.journal_path}-{uuid.uuid4().hex}"
+            journal = open(path, 'a', encoding='utf-8')
+            # Another session may have recovered and removed the file
+            # before the lock was taken
+            if _try_lock(journal) and os.path.exists(path) and \
+                    os.path.samestat(os.fstat(journal.fileno()), os.stat(path)):
+                self._journal, self.journal_file = journal, path
+                return
+            journal.close()
+
+    def _fill_queue(self):
+        if self._exhausted:
+            return
+        needed = self.prefetch - len(self._queue)
+        if needed <= 0:
+            return
+        cards = self.db.get_next_due_cards(needed, self.deck_id, list(self._seen))
+        if len(cards) < needed:
+            self._exhausted = True
+        previews = self.preview_engine.preview_batch(cards)
+        for card in cards:
+            card['button_intervals'] = previews[card['id']]
+            self._seen.add(card['id'])
+            self._queue.append(card)
+
+    @staticmethod
+    def recover_orphaned_journals(database, journal_path: str) -> int:
+        """
+        Replay the journals of sessions that are no longer running
+
+        Journals still locked by a running session are left alone.
+
+        Args:
+            database: Database receiving the reviews
+            journal_path: Journal path the sessions were created with
+
+        Returns:
+            Number of reviews recovered
+        """
+        recovered = 0
+        paths = [journal_path] + glob.glob(f"{glob.escape(journal_path)}-*")
+        for path in paths:
+            try:
+                journal = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            with journal:
+                if not _try_lock(journal):
+                    continue
+                recovered += StudySession._replay(database, journal)
+            _remove(path)
+        return recovered
+
+    @staticmethod
+    def recover_journal(database, journal_path: str) -> int:
+        """
+        Replay answers left in a journal by an interrupted session
+
+        Reviews that already reached review_history are skipped, so the
+        journal can be replayed safely more than once. The journal must not
+        belong to a running session; start() only replays unlocked ones.
+
+        Args:
+            database: Database receiving the reviews
+            journal_path: Path of the journal file
+
+        Returns:
+            Number of reviews recovered
+        """
+        try:
+            journal = open(journal_path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return 0
+        with journal:
+            recovered = StudySession._replay(database, journal)
+        _remove(journal_path)
+        return recovered
+
+    @staticmethod
+    def _replay(database, journal) -> int:
+        reviews = []
+        journal.seek(0)
+        for line in journal:
+            try:
+                reviews.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line means the answer was never acknowledged
+                break
+
+        cursor = database.conn.cursor()
+        missing = []
+        for review in reviews:
+            cursor.execute(
+                "SELECT 1 FROM review_history WHERE card_id = ? AND reviewed_at = ?",
+                (review['card_id'], review['reviewed_at'])
+            )
+            if cursor.fetchone() is None:
+                missing.append(review)
+
+        if missing:
+            database.apply_review_batch(missing)
+        return len(missing)
@@ -0,0 +1,133 @@
+"""Synthetic import sources for the importer tests
+
+Writes small CSV, JSON and Anki .apkg files, so no real user collection
+is needed. The .apkg holds only the collection tables the importer reads.
+"""
+
+import csv
+import json
+import sqlite3
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+
+# Anki collection creation time (2024-01-01 12:00 UTC) and a due offset in days
+ANKI_CREATED = 1704110400
+ANKI_REVIEW_DUE = 30
+
+
+def write_csv(path: Path, cards: List[Dict]) -> Path:
+    """Write cards as a CSV file with the export columns"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['question', 'answer', 'example', 'tags'])
+        writer.writeheader()
+        for card in cards:
+            writer.writerow({key: card.get(key, '') for key in writer.fieldnames})
+    return path
+
+
+def write_json(path: Path, decks: List[Dict]) -> Path:
+    """Write decks as a JSON file in the multi-deck format"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'decks': decks}, f)
+    return path
+
+
+def write_apkg(path: Path, decks: Dict[int, str], notes: List[Dict]) -> Path:
+    """
+    Write a minimal Anki package
+
+    Args:
+        path: Target .apkg path
+        decks: Anki deck ids mapped to deck names
+        notes: Dictionaries with deck_id, fields, tags and optional type,
+               ivl, factor, reps, due and reviews (list of (ease, time_ms))
+
+    Returns:
+        The written path
+    """
+    collection = path.with_suffix('.anki2')
+    conn = sqlite3.connect(collection)
+    conn.executescript("""
+        CREATE TABLE col (id INTEGER PRIMARY KEY, crt INTEGER NOT NULL, decks TEXT NOT NULL);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, flds TEXT NOT NULL, tags TEXT NOT NULL);
+        CREATE TABLE cards (
+            id INTEGER PRIMARY KEY, nid INTEGER NOT NULL, did INTEGER NOT NULL,
+            type INTEGER NOT NULL, ivl INTEGER NOT NULL, factor INTEGER NOT NULL,
+            reps INTEGER NOT NULL, due INTEGER NOT NULL
+        );
+        CREATE TABLE revlog (
+            id INTEGER PRIMARY KEY, cid INTEGER NOT NULL, ease INTEGER NOT NULL,
+            time INTEGER NOT NULL
+        );
+    """)
+    conn.execute(
+        "INSERT INTO col (id, crt, decks) VALUES (1, ?, ?)",
+        (ANKI_CREATED, json.dumps({str(deck_id): {'name': name} for deck_id, name in decks.items()}))
+    )
+    review_id = ANKI_CREATED * 1000
+    for index, note in enumerate(notes, start=1):
+        conn.execute(
+            "INSERT INTO notes (id, flds, tags) VALUES (?, ?, ?)",
+            (index, '\x1f'.join(note['fields']), ' '.join(note.get('tags', [])))
+        )
+        conn.execute(
+            """INSERT INTO cards (id, nid, did, type, ivl, factor, reps, due)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (index, index, note['deck_id'], note.get('type', 0), note.get('ivl', 0),
+             note.get('factor', 0), note.get('reps', 0), note.get('due', index))
+        )
+        for ease, time_ms in note.get('reviews', []):
+            review_id += 60000
+            conn.execute(
+                "INSERT INTO revlog (id, cid, ease, time) VALUES (?, ?, ?, ?)",
+                (review_id, index, ease, time_ms)
+            )
+    conn.commit()
+    conn.close()
+
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.write(collection, 'collection.anki2')
+        archive.writestr('media', '{}')
+    collection.unlink()
+    return path
+
+
+def build_sources(directory: Path) -> Dict[str, Path]:
+    """
+    Write one source of every supported format into a directory
+
+    Returns:
+        Format names mapped to the written paths
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    nested = directory / 'nested'
+    nested.mkdir(exist_ok=True)
+    return {
+        'csv': write_csv(directory / 'vocabulary.csv', [
+            {'question': 'der Hund', 'answer': 'the dog', 'tags': 'german, nouns'},
+            {'question': 'die Katze', 'answer': 'the cat', 'tags': 'german, nouns'},
+            {'question': '', 'answer': 'missing question'},
+        ]),
+        'json': write_json(nested / 'history.json', [
+            {
+                'name': 'World History',
+                'description': 'Dates',
+                'cards': [
+                    {'question': 'Fall of Rome', 'answer': '476', 'tags': ['history'],
+                     'ease_factor': 2.3, 'interval': 6, 'repetitions': 2,
+                     'next_review': '2024-02-01',
+                     'reviews': [{'quality': 4, 'reviewed_at': '2024-01-20 10:00:00',
+                                  'time_spent': 7}]},
+                ]
+            },
+            {'name': 'Empty', 'cards': []},
+        ]),
+        'apkg': write_apkg(directory / 'shared.apkg', {1: 'Default', 1700: 'Chemistry'}, [
+            {'deck_id': 1700, 'fields': ['H<sub>2</sub>O', 'Water<br>liquid'],
+             'tags': ['chem'], 'type': 2, 'ivl': 10, 'factor': 2600, 'reps': 3,
+             'due': ANKI_REVIEW_DUE, 'reviews': [(3, 8000), (0, 0), (1, 12000)]},
+            {'deck_id': 1700, 'fields': ['NaCl', 'Salt &amp; more'], 'tags': ['chem']},
+        ]),
+    }
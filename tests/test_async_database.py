@@ -0,0 +1,43 @@
+"""Tests for the asyncio database facade"""
+
+import asyncio
+import time
+
+from core.async_database import AsyncDatabase
+
+
+def test_writes_reads_and_snapshot(tmp_path):
+    async def scenario():
+        async with AsyncDatabase(str(tmp_path / "studycards.db")) as db:
+            deck_id = await db.add_deck("Deck", 1)
+            card_id = await db.add_card(deck_id, "q", "a")
+            await db.sync_card_media(card_id)
+            assert not db._write_db.conn.in_transaction
+
+            snapshot = await db.get_dashboard_snapshot()
+            await db.save_dashboard_snapshot(snapshot)
+            loaded = await db.load_dashboard_snapshot()
+            assert loaded.cards_due_today == 1
+            assert await db.count_due_cards(deck_id) == 1
+
+    asyncio.run(scenario())
+
+
+def test_close_does_not_block_the_event_loop(tmp_path):
+    async def scenario():
+        db = AsyncDatabase(str(tmp_path / "studycards.db"))
+        await db.start()
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        db._reader_pool.submit(time.sleep, 0.3)
+        await db.close()
+        task.cancel()
+        return len(ticks)
+
+    assert asyncio.run(scenario()) > 5
@@ -0,0 +1,181 @@
+"""Tests for study day numbers and the day number migration"""
+
+import sqlite3
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from core.database import Database
+from core.day_clock import DayClock
+
+
+BERLIN = ZoneInfo("Europe/Berlin")
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def day(date_str):
+    return DayClock.day_of_date(date_str)
+
+
+# Rollover hour
+def test_day_starts_at_rollover_hour():
+    clock = DayClock(rollover_hour=4, tz=timezone.utc)
+    assert clock.day_of(datetime(2024, 3, 10, 3, 59, tzinfo=timezone.utc)) == day("2024-03-09")
+    assert clock.day_of(datetime(2024, 3, 10, 4, 0, tzinfo=timezone.utc)) == day("2024-03-10")
+
+
+def test_midnight_rollover_matches_calendar_date():
+    clock = DayClock(rollover_hour=0, tz=timezone.utc)
+    assert clock.day_of(datetime(2024, 3, 10, 0, 0, tzinfo=timezone.utc)) == day("2024-03-10")
+    assert clock.day_of(datetime(2024, 3, 9, 23, 59, tzinfo=timezone.utc)) == day("2024-03-09")
+
+
+def test_rollover_uses_local_time():
+    clock = DayClock(rollover_hour=4, tz=BERLIN)
+    # 02:30 UTC is 03:30 in Berlin in winter, still the previous study day
+    assert clock.day_of(datetime(2024, 1, 15, 2, 30, tzinfo=timezone.utc)) == day("2024-01-14")
+    assert clock.day_of(datetime(2024, 1, 15, 3, 0, tzinfo=timezone.utc)) == day("2024-01-15")
+
+
+def test_naive_datetimes_are_utc():
+    clock = DayClock(rollover_hour=4, tz=NEW_YORK)
+    naive = datetime(2024, 6, 1, 9, 0)
+    assert clock.day_of(naive) == clock.day_of(naive.replace(tzinfo=timezone.utc))
+
+
+def test_invalid_rollover_hour():
+    with pytest.raises(ValueError):
+        DayClock(rollover_hour=24)
+
+
+# Daylight saving time
+def test_rollover_across_spring_forward():
+    # New York moves from 02:00 EST to 03:00 EDT on 2024-03-10
+    clock = DayClock(rollover_hour=4, tz=NEW_YORK)
+    before = datetime(2024, 3, 10, 7, 59, tzinfo=timezone.utc)  # 03:59 EDT
+    after = datetime(2024, 3, 10, 8, 0, tzinfo=timezone.utc)    # 04:00 EDT
+    assert clock.day_of(before) == day("2024-03-09")
+    assert clock.day_of(after) == day("2024-03-10")
+
+
+def test_rollover_across_fall_back():
+    # New York moves from 02:00 EDT back to 01:00 EST on 2024-11-03
+    clock = DayClock(rollover_hour=4, tz=NEW_YORK)
+    before = datetime(2024, 11, 3, 8, 59, tzinfo=timezone.utc)  # 03:59 EST
+    after = datetime(2024, 11, 3, 9, 0, tzinfo=timezone.utc)    # 04:00 EST
+    assert clock.day_of(before) == day("2024-11-02")
+    assert clock.day_of(after) == day("2024-11-03")
+
+
+def test_repeated_hour_stays_on_one_day():
+    # Both 01:30 local times of the fall-back night belong to the same study day
+    clock = DayClock(rollover_hour=4, tz=NEW_YORK)
+    first = datetime(2024, 11, 3, 5, 30, tzinfo=timezone.utc)   # 01:30 EDT
+    second = datetime(2024, 11, 3, 6, 30, tzinfo=timezone.utc)  # 01:30 EST
+    assert clock.day_of(first) == clock.day_of(second) == day("2024-11-02")
+
+
+# Conversions
+def test_day_of_timestamp_honours_timezone():
+    clock = DayClock(rollover_hour=4, tz=BERLIN)
+    assert clock.day_of_timestamp("2024-07-01 01:30:00") == day("2024-06-30")  # 03:30 CEST
+    assert clock.day_of_timestamp("2024-07-01 02:00:00") == day("2024-07-01")  # 04:00 CEST
+    assert clock.day_of_timestamp(None) is None
+    assert clock.day_of_timestamp("") is None
+
+
+def test_day_of_date_round_trip():
+    assert DayClock.day_of_date("1970-01-01") == 0
+    assert DayClock.day_of_date("2024-02-29 12:00:00") == DayClock.day_of_date("2024-02-29")
+    assert DayClock.date_of_day(DayClock.day_of_date("2024-02-29")) == "2024-02-29"
+    assert DayClock.day_of_date(None) is None
+
+
+# Migration of databases created before day numbers
+def _create_legacy_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            color TEXT DEFAULT '#3498db',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE decks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            category_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            deck_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            example TEXT,
+            tags TEXT,
+            difficulty INTEGER DEFAULT 0,
+            ease_factor REAL DEFAULT 2.5,
+            interval INTEGER DEFAULT 0,
+            repetitions INTEGER DEFAULT 0,
+            next_review DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE review_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            card_id INTEGER NOT NULL,
+            quality INTEGER NOT NULL,
+            reviewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            time_spent INTEGER
+        );
+        INSERT INTO decks (name, category_id) VALUES ('Legacy', NULL);
+        INSERT INTO cards (deck_id, question, answer, next_review) VALUES
+            (1, 'q1', 'a1', '2024-03-10'),
+            (1, 'q2', 'a2', NULL);
+        INSERT INTO review_history (card_id, quality, reviewed_at, time_spent) VALUES
+            (1, 4, '2024-03-10 06:30:00', 5),
+            (1, 3, '2024-03-10 08:30:00', 5);
+    """)
+    conn.commit()
+    conn.close()
+
+
+def test_migration_backfills_day_numbers(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _create_legacy_database(path)
+
+    database = Database(path, DayClock(rollover_hour=4, tz=NEW_YORK))
+    database.initialize()
+    try:
+        cards = database.conn.execute(
+            "SELECT question, next_review_day FROM cards ORDER BY id"
+        ).fetchall()
+        assert [tuple(row) for row in cards] == [("q1", day("2024-03-10")), ("q2", None)]
+
+        # 06:30 UTC is 02:30 EDT (previous study day), 08:30 UTC is 04:30 EDT
+        review_days = [row[0] for row in database.conn.execute(
+            "SELECT review_day FROM review_history ORDER BY id"
+        )]
+        assert review_days == [day("2024-03-09"), day("2024-03-10")]
+    finally:
+        database.close()
+
+
+def test_migration_runs_once(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _create_legacy_database(path)
+    for _ in range(2):
+        database = Database(path, DayClock(rollover_hour=4, tz=NEW_YORK))
+        database.initialize()
+        database.close()
+
+    database = Database(path)
+    database.connect()
+    try:
+        columns = [row['name'] for row in database.conn.execute("PRAGMA table_info(cards)")]
+        assert columns.count('next_review_day') == 1
+    finally:
+        database.close()
@@ -0,0 +1,111 @@
+"""Tests for duplicate card detection"""
+
+import csv
+import random
+
+import pytest
+
+from core.database import Database
+from core.deduplication import DeduplicationEngine
+
+
+TEMPLATE = "What is the English translation of the German word {}?"
+
+
+def _words(count, seed=5):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice('bcdfghklmnprstwz') + rng.choice('aeiou') for _ in range(3)))
+    return sorted(words)
+
+
+@pytest.fixture
+def database():
+    database = Database(':memory:')
+    database.initialize()
+    yield database
+    database.close()
+
+
+def _templated_deck(database, words):
+    deck_id = database.add_deck("German", 1)
+    database.add_cards_batch(deck_id, [
+        {'question': TEMPLATE.format(word), 'answer': f"the {word[::-1]}"} for word in words
+    ])
+    return deck_id
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['question', 'answer', 'example', 'tags'])
+        writer.writeheader()
+        for question, answer, tags in rows:
+            writer.writerow({'question': question, 'answer': answer, 'example': '', 'tags': tags})
+
+
+def test_near_duplicates_are_found():
+    engine = DeduplicationEngine()
+    engine.add(1, "What is the capital of France?", "Paris")
+    engine.add(2, "What is the capital of Italy?", "Rome")
+    assert engine.find_match("What is the capital of France, again?", "Paris")[0] == 1
+    assert engine.find_match("What is the capital of Spain?", "Madrid") is None
+
+
+def test_same_template_with_other_answer_is_not_similar():
+    engine = DeduplicationEngine()
+    a = engine.signature("What is the derivative of sin(x) with respect to x?", "cos(x)")
+    b = engine.signature("What is the derivative of cos(x) with respect to x?", "-sin(x)")
+    assert engine.similarity(a, b) < engine.threshold
+
+
+def test_report_does_not_chain_templated_cards(database):
+    words = _words(1500)
+    deck_id = _templated_deck(database, words)
+    first = database.get_cards_by_deck(deck_id)[0]
+    duplicate = database.add_card(deck_id, first['question'].upper(), first['answer'])
+    near = database.add_card(deck_id, first['question'].replace('?', ', again?'), first['answer'])
+
+    report = database.find_duplicate_cards(deck_id)
+    assert {'card_ids': [first['id'], duplicate, near], 'exact': False,
+            'similarity': report[0]['similarity']} in report
+    # Only cards with near-identical words pair up, never whole templates
+    assert max(len(group['card_ids']) for group in report) == 3
+    assert len(report) < 20
+    assert all(group['similarity'] >= 0.8 for group in report)
+
+
+def test_groups_join_the_leader_only(database):
+    base = "The quick brown fox jumps over the lazy dog near the river bank"
+    deck_id = database.add_deck("Chain", 1)
+    first = database.add_card(deck_id, base, "ans")
+    second = database.add_card(deck_id, base.replace("lazy dog", "lazy cat"), "ans")
+    third = database.add_card(
+        deck_id, base.replace("lazy dog", "lazy cat").replace("river bank", "old mill"), "ans"
+    )
+
+    # third resembles second (0.875) but not the group leader first (0.78)
+    report = DeduplicationEngine(database, threshold=0.8).find_duplicates(deck_id)
+    assert [group['card_ids'] for group in report] == [[first, second]]
+    assert third not in report[0]['card_ids']
+
+
+@pytest.mark.parametrize('mode', ['skip', 'merge'])
+def test_csv_import_only_acts_on_exact_duplicates(database, tmp_path, mode):
+    words = _words(300)
+    deck_id = _templated_deck(database, words[:200])
+    path = tmp_path / 'german.csv'
+    _write_csv(path, [
+        (TEMPLATE.format(word).upper(), f"the {word[::-1]}", 'german') for word in words[:10]
+    ] + [
+        (TEMPLATE.format(word), f"the {word[::-1]}", 'german') for word in words[200:]
+    ])
+
+    counts = database.import_deck_from_csv(deck_id, str(path), mode)
+    acted = {'skip': 'skipped', 'merge': 'merged'}[mode]
+    assert counts['added'] == 100
+    assert counts[acted] == 10
+    assert database.get_total_cards() == 300
+
+    tags = [card['tags'] for card in database.get_cards_by_deck(deck_id)[:10]]
+    assert tags == (['german'] * 10 if mode == 'merge' else [''] * 10)
@@ -0,0 +1,148 @@
+"""Tests for the bulk import pipeline"""
+
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.database import Database
+from core.importer import ImportPipeline, parse_source
+
+from .fixtures import ANKI_CREATED, ANKI_REVIEW_DUE, build_sources, write_csv, write_json
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "studycards.db"))
+    database.initialize()
+    yield database
+    database.close()
+
+
+def _cards_by_deck(database):
+    return {
+        deck['name']: {card['question']: card for card in database.get_cards_by_deck(deck['id'])}
+        for deck in database.get_all_decks()
+    }
+
+
+def _check_imported(database, report):
+    assert not report.failed
+    assert report.rows == 5
+    assert sorted(progress.status for progress in report.files) == ['done', 'done', 'done']
+
+    decks = _cards_by_deck(database)
+    assert set(decks) == {'vocabulary', 'World History', 'Chemistry'}
+    assert set(decks['vocabulary']) == {'der Hund', 'die Katze'}
+    assert decks['vocabulary']['der Hund']['tags'] == 'german, nouns'
+
+    rome = decks['World History']['Fall of Rome']
+    assert (rome['interval'], rome['repetitions'], rome['next_review']) == (6, 2, '2024-02-01')
+
+    water = decks['Chemistry']['H2O']
+    assert water['answer'] == 'Water\nliquid'
+    assert water['ease_factor'] == 2.6
+    assert water['next_review_day'] is not None
+    assert decks['Chemistry']['NaCl']['answer'] == 'Salt & more'
+
+    assert database.get_total_reviews() == 3
+    skipped = {progress.path.rsplit('.', 1)[-1]: progress.skipped for progress in report.files}
+    assert skipped == {'csv': 1, 'json': 0, 'apkg': 0}
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_import_directory(tmp_path, database, workers):
+    build_sources(tmp_path / 'sources')
+    report = ImportPipeline(database, workers=workers).run(str(tmp_path / 'sources'))
+    _check_imported(database, report)
+
+
+def test_import_zip(tmp_path, database):
+    sources = build_sources(tmp_path / 'sources')
+    archive_path = tmp_path / 'sources.zip'
+    with zipfile.ZipFile(archive_path, 'w') as archive:
+        for path in sources.values():
+            archive.write(path, path.relative_to(tmp_path / 'sources'))
+
+    report = ImportPipeline(database, workers=0).run(str(archive_path))
+    _check_imported(database, report)
+
+
+def test_apkg_schedule_and_reviews(tmp_path):
+    sources = build_sources(tmp_path)
+    decks = parse_source(str(sources['apkg']))['decks']
+    assert [deck['name'] for deck in decks] == ['Chemistry']
+
+    water = decks[0]['cards'][0]
+    assert water['repetitions'] == 3
+    # Anki "Good" and "Again" answers; the manual reschedule (ease 0) is dropped
+    assert [quality for quality, _, _ in water['reviews']] == [4, 0]
+    assert [time_spent for _, _, time_spent in water['reviews']] == [8, 12]
+    created = datetime.fromtimestamp(ANKI_CREATED).date()
+    assert water['next_review'] == str(created + timedelta(days=ANKI_REVIEW_DUE))
+
+
+def test_file_without_valid_rows_creates_no_deck(tmp_path, database):
+    garbage = tmp_path / 'garbage.csv'
+    garbage.write_text("foo,bar\n1,2\n3,4\n", encoding='utf-8')
+
+    report = ImportPipeline(database, workers=0).run(str(garbage))
+    progress = report.files[0]
+    assert progress.status == 'empty'
+    assert (progress.decks, progress.rows, progress.skipped) == (0, 0, 2)
+    assert report.empty == [progress]
+    assert database.get_all_decks() == []
+
+
+def test_unreadable_file_is_reported(tmp_path, database):
+    broken = tmp_path / 'broken.apkg'
+    broken.write_bytes(b'not a zip file')
+    write_csv(tmp_path / 'ok.csv', [{'question': 'q', 'answer': 'a'}])
+
+    report = ImportPipeline(database, workers=0).run(str(tmp_path))
+    assert [progress.path for progress in report.failed] == [str(broken)]
+    assert report.failed[0].error.startswith('BadZipFile')
+    assert report.rows == 1
+
+
+@pytest.mark.parametrize('card', [
+    {'question': 'q', 'answer': 'a', 'next_review': 'next week'},
+    {'question': 'q', 'answer': 'a',
+     'reviews': [{'quality': 4, 'reviewed_at': 'yesterday'}]},
+])
+def test_malformed_dates_fail_only_their_file(tmp_path, database, card):
+    write_json(tmp_path / 'bad.json', [{'name': 'Bad', 'cards': [card]}])
+    write_csv(tmp_path / 'good.csv', [{'question': 'q', 'answer': 'a'}])
+
+    report = ImportPipeline(database, workers=0).run(str(tmp_path))
+    assert [progress.path for progress in report.failed] == [str(tmp_path / 'bad.json')]
+    assert report.failed[0].error.startswith('ValueError')
+    assert [deck['name'] for deck in database.get_all_decks()] == ['good']
+
+
+def test_store_error_rolls_back_the_whole_file(tmp_path, database):
+    database.conn.execute(
+        """CREATE TRIGGER reject_boom BEFORE INSERT ON cards WHEN NEW.question = 'boom'
+           BEGIN SELECT RAISE(ABORT, 'rejected'); END"""
+    )
+    write_json(tmp_path / 'mixed.json', [
+        {'name': 'Fine', 'cards': [{'question': 'q', 'answer': 'a'}]},
+        {'name': 'Broken', 'cards': [{'question': 'boom', 'answer': 'a'}]},
+    ])
+    write_csv(tmp_path / 'other.csv', [{'question': 'q', 'answer': 'a'}])
+
+    report = ImportPipeline(database, workers=0).run(str(tmp_path))
+    assert [progress.path for progress in report.failed] == [str(tmp_path / 'mixed.json')]
+    assert 'rejected' in report.failed[0].error
+    assert [deck['name'] for deck in database.get_all_decks()] == ['other']
+    assert database.get_total_cards() == 1
+
+
+def test_timestamps_are_normalized_to_utc(tmp_path):
+    path = write_json(tmp_path / 'zoned.json', [{'name': 'Zoned', 'cards': [
+        {'question': 'q', 'answer': 'a', 'next_review': '2024-02-01T08:00:00',
+         'reviews': [{'quality': 5, 'reviewed_at': '2024-01-20T10:00:00+02:00'}]},
+    ]}])
+    card = parse_source(str(path))['decks'][0]['cards'][0]
+    assert card['next_review'] == '2024-02-01'
+    assert card['reviews'] == [(5, '2024-01-20 08:00:00', 0)]
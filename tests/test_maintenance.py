@@ -0,0 +1,140 @@
+"""Tests for the idle-time maintenance scheduler"""
+
+import sqlite3
+
+import pytest
+
+from core.database import Database
+from core.maintenance import MaintenanceScheduler
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "studycards.db"))
+    database.initialize()
+    yield database
+    database.close()
+
+
+def _add_old_reviews(database, count, days_ago=400):
+    deck_id = database.add_deck("Deck", 1)
+    day = database.clock.date_of_day(database.clock.today() - days_ago)
+    database.add_cards_batch(deck_id, [{
+        'question': f"q{index}", 'answer': 'a' * 500,
+        'reviews': [(4, f"{day} 12:00:00", 5)] * 5
+    } for index in range(count // 5)])
+
+
+def _freelist(database):
+    return database.conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def _attached(database):
+    return [row[1] for row in database.conn.execute("PRAGMA database_list")]
+
+
+def test_vacuum_runs_after_pruning(database):
+    _add_old_reviews(database, 3000)
+    scheduler = MaintenanceScheduler(database, idle_seconds=0, history_retention_days=30)
+    assert scheduler.due_jobs()[:2] == ['prune_history', 'incremental_vacuum']
+
+    results = scheduler.run_pending(budget=30)
+    assert [result.job for result in results][:2] == ['prune_history', 'incremental_vacuum']
+    assert database.get_total_reviews() == 0
+    assert _freelist(database) == 0
+
+
+def test_pruning_requests_a_vacuum_before_its_interval(database):
+    scheduler = MaintenanceScheduler(database, idle_seconds=0, history_retention_days=30)
+    scheduler.run_job('incremental_vacuum')
+    assert 'incremental_vacuum' not in scheduler.due_jobs()
+
+    _add_old_reviews(database, 2000)
+    scheduler.run_job('prune_history')
+    assert _freelist(database) > 0
+    assert 'incremental_vacuum' in scheduler.due_jobs()
+
+    result = scheduler.run_job('incremental_vacuum')
+    assert result.detail.startswith('released ')
+    assert _freelist(database) == 0
+    assert 'incremental_vacuum' not in scheduler.due_jobs()
+
+
+def test_foreground_write_pauses_and_resumes_job(database):
+    _add_old_reviews(database, 100)
+    scheduler = MaintenanceScheduler(database, idle_seconds=0, history_retention_days=30,
+                                     prune_batch=10)
+    step = scheduler._step
+    steps = []
+
+    def step_then_write():
+        result = step()
+        steps.append(scheduler._running)
+        if len(steps) == 1:
+            database.add_category("Written while pruning")
+        return result
+
+    scheduler._step = step_then_write
+    assert scheduler.run_pending(budget=30) == []
+    assert scheduler._running == 'prune_history'
+    assert database.get_total_reviews() == 90
+
+    results = scheduler.run_pending(budget=30)
+    assert results[0].job == 'prune_history'
+    assert results[0].detail == 'pruned 100 reviews'
+    assert database.get_total_reviews() == 0
+
+
+def test_not_idle_runs_nothing(database):
+    scheduler = MaintenanceScheduler(database, idle_seconds=3600)
+    assert scheduler.run_pending() == []
+    assert scheduler.get_log() == []
+
+
+def test_failed_job_is_recorded_and_retried(database, tmp_path):
+    _add_old_reviews(database, 50)
+    scheduler = MaintenanceScheduler(
+        database, idle_seconds=0, history_retention_days=30,
+        archive_path=str(tmp_path / "missing" / "archive.db"), retry_seconds=3600
+    )
+    result = scheduler.run_job('prune_history')
+    assert result.failed
+    assert result.detail.startswith('failed: ')
+    assert scheduler._running is None and scheduler._steps is None
+    assert database.get_total_reviews() == 50
+
+    log = {row['job']: row['detail'] for row in scheduler.get_log()}
+    assert log['prune_history'] == result.detail
+    assert 'prune_history' not in scheduler.due_jobs()
+
+    scheduler.retry_seconds = 0
+    scheduler.archive_path = str(tmp_path / "archive.db")
+    assert 'prune_history' in scheduler.due_jobs()
+    assert not scheduler.run_job('prune_history').failed
+
+
+def test_archive_is_attached_only_while_pruning(database, tmp_path):
+    _add_old_reviews(database, 50)
+    archive_path = str(tmp_path / "archive.db")
+    scheduler = MaintenanceScheduler(database, history_retention_days=30,
+                                     archive_path=archive_path)
+    assert scheduler.run_job('prune_history').detail == 'pruned 50 reviews'
+    assert _attached(database) == ['main']
+
+    archive = sqlite3.connect(archive_path)
+    assert archive.execute("SELECT COUNT(*) FROM review_history").fetchone()[0] == 50
+    archive.close()
+
+
+def test_archive_is_detached_after_failure(database, tmp_path):
+    _add_old_reviews(database, 50)
+    archive_path = str(tmp_path / "archive.db")
+    archive = sqlite3.connect(archive_path)
+    archive.execute("CREATE TABLE review_history (id INTEGER PRIMARY KEY)")
+    archive.close()
+
+    scheduler = MaintenanceScheduler(database, history_retention_days=30,
+                                     archive_path=archive_path)
+    assert scheduler.run_job('prune_history').failed
+    assert _attached(database) == ['main']
+    assert database.get_total_reviews() == 50
@@ -0,0 +1,167 @@
+"""Tests for content-addressed media attachments"""
+
+import base64
+
+import pytest
+
+from core.database import Database
+from core.media_store import MediaStore
+
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "studycards.db"))
+    database.initialize()
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def store(database, tmp_path):
+    return MediaStore(database, str(tmp_path / "media"))
+
+
+@pytest.fixture
+def deck_id(database):
+    return database.add_deck("Deck", 1)
+
+
+def _ref_count(database, media_hash):
+    row = database.conn.execute("SELECT ref_count FROM media WHERE hash = ?", (media_hash,)).fetchone()
+    return row['ref_count'] if row else None
+
+
+# Reference counts
+def test_identical_content_is_stored_once(store):
+    assert store.add_bytes(PNG, 'image/png') == store.add_bytes(PNG, 'image/png')
+    assert len(list(store.media_dir.rglob('*'))) == 2  # One directory, one file
+
+
+def test_card_writes_keep_ref_count(database, store, deck_id):
+    media_hash = store.add_bytes(PNG, 'image/png')
+    reference = store.reference(media_hash)
+    first = database.add_card(deck_id, f"What is this? {reference}", "A logo")
+    database.add_cards_batch(deck_id, [{'question': 'q', 'answer': reference}])
+    assert _ref_count(database, media_hash) == 2
+
+    database.update_card(first, "No picture", "A logo")
+    assert _ref_count(database, media_hash) == 1
+
+    database.conn.execute("DELETE FROM cards")
+    database.conn.commit()
+    assert _ref_count(database, media_hash) == 0
+
+
+def test_add_bytes_links_in_same_transaction(database, store, deck_id):
+    card_id = database.add_card(deck_id, "q", "a")
+    media_hash = store.add_bytes(PNG, 'image/png', card_id=card_id, field='answer')
+    assert _ref_count(database, media_hash) == 1
+    assert [media['field'] for media in store.get_card_media(card_id)] == ['answer']
+
+
+# Garbage collection
+def test_gc_keeps_new_media_during_grace(database, store):
+    media_hash = store.add_bytes(PNG, 'image/png')
+    assert store.gc() == 0
+    assert store.path_of(media_hash).exists()
+
+    assert store.gc(grace_seconds=0) == 1
+    assert not store.path_of(media_hash).exists()
+    assert _ref_count(database, media_hash) is None
+
+
+def test_gc_restores_links_of_cards_written_directly(database, store, deck_id):
+    media_hash = store.add_bytes(PNG, 'image/png')
+    database.conn.execute(
+        "INSERT INTO cards (deck_id, question, answer) VALUES (?, ?, 'a')",
+        (deck_id, store.reference(media_hash))
+    )
+    database.conn.commit()
+
+    assert store.gc(grace_seconds=0) == 0
+    assert _ref_count(database, media_hash) == 1
+    assert store.load(media_hash) == PNG
+
+
+def test_gc_removes_media_of_deleted_cards(database, store, deck_id):
+    media_hash = store.add_bytes(PNG, 'image/png')
+    card_id = database.add_card(deck_id, store.reference(media_hash), "a")
+    database.delete_card(card_id)
+    assert store.gc(grace_seconds=0) == 1
+
+
+# Inline media
+def _card(database, card_id):
+    return database.conn.execute("SELECT * FROM cards WHERE id = ?", (card_id,)).fetchone()
+
+
+@pytest.mark.parametrize('payload', [
+    base64.b64encode(PNG).decode(),               # Padded
+    base64.b64encode(PNG + b'x').decode().rstrip('='),  # Unpadded
+])
+def test_extract_data_uri_followed_by_text(database, store, deck_id, payload):
+    question = f"<img src=\"data:image/png;base64,{payload}\">\nWhat is this ab"
+    card_id = database.add_card(deck_id, question, f"data:image/png;base64,{payload} is a logo")
+
+    assert store.extract_inline_media() == 1
+    card = _card(database, card_id)
+    [media_hash] = store.find_references(card['question'])
+    assert card['question'] == f"<img src=\"{store.reference(media_hash)}\">\nWhat is this ab"
+    assert card['answer'] == f"{store.reference(media_hash)} is a logo"
+    assert store.load(media_hash) == base64.b64decode(payload + '=' * (-len(payload) % 4))
+    assert _ref_count(database, media_hash) == 2
+
+
+def test_extract_wrapped_payload(database, store, deck_id):
+    encoded = base64.b64encode(PNG).decode()
+    wrapped = '\n'.join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    card_id = database.add_card(deck_id, f"data:image/png;base64,{wrapped}\nWhat is this?", "a")
+
+    store.extract_inline_media()
+    question = _card(database, card_id)['question']
+    [media_hash] = store.find_references(question)
+    assert question == f"{store.reference(media_hash)}\nWhat is this?"
+    assert store.load(media_hash) == PNG
+
+
+def test_undecodable_data_uri_is_left_inline(database, store, deck_id):
+    question = "data:image/png;base64,A\nWhat is this?"
+    card_id = database.add_card(deck_id, question, "a")
+    assert store.extract_inline_media() == 0
+    assert _card(database, card_id)['question'] == question
+
+
+def test_extract_commits_per_batch(database, store, deck_id):
+    payload = base64.b64encode(PNG).decode()
+    for _ in range(3):
+        database.add_card(deck_id, f"data:image/png;base64,{payload}", "a")
+
+    commits = []
+    database.conn.set_trace_callback(
+        lambda sql: commits.append(sql) if sql.strip().upper() == 'COMMIT' else None
+    )
+    assert store.extract_inline_media(batch_size=2) == 3
+    database.conn.set_trace_callback(None)
+    assert len(commits) == 2
+
+
+# Cache
+def test_lru_cache_evicts_least_recently_used(database, tmp_path):
+    store = MediaStore(database, str(tmp_path / "media"), cache_bytes=250)
+    hashes = [store.add_bytes(bytes([index]) * 100) for index in range(3)]
+
+    store.load(hashes[0])
+    store.load(hashes[1])
+    store.load(hashes[0])
+    store.load(hashes[2])
+    assert list(store._cache) == [hashes[0], hashes[2]]
+    assert store._cached_size == 200
+
+    store.path_of(hashes[0]).unlink()
+    store.path_of(hashes[1]).unlink()
+    assert store.load(hashes[0]) == bytes([0]) * 100  # Served from the cache
+    with pytest.raises(FileNotFoundError):  # Evicted, read from disk again
+        store.load(hashes[1])
@@ -0,0 +1,117 @@
+"""Tests for the headless study session"""
+
+import glob
+
+import pytest
+
+from core.database import Database
+from core.study_session import StudySession
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "studycards.db"))
+    database.initialize()
+    yield database
+    database.close()
+
+
+def _deck(database, name, cards):
+    deck_id = database.add_deck(name, 1)
+    database.add_cards_batch(deck_id, [
+        {'question': f"{name} {index}", 'answer': str(index)} for index in range(cards)
+    ])
+    return deck_id
+
+
+def _review_count(database):
+    return database.conn.execute("SELECT COUNT(*) FROM review_history").fetchone()[0]
+
+
+def _journals(database):
+    return glob.glob(f"{database.db_path}.session-journal*")
+
+
+def test_prefetch_refills_queue(database):
+    deck_id = _deck(database, "deck", 12)
+    session = StudySession(database, deck_id, prefetch=4, flush_size=100)
+    session.start()
+    assert session.remaining() == 4
+    assert set(session.current_card()['button_intervals']) == {0, 1, 2, 3}
+
+    answered = set()
+    while not session.is_finished():
+        answered.add(session.current_card()['id'])
+        session.answer(2)
+        assert session.remaining() <= 4
+    assert len(answered) == 12
+    session.close()
+
+
+def test_flush_by_size(database):
+    deck_id = _deck(database, "deck", 10)
+    with StudySession(database, deck_id, flush_size=3, flush_interval=3600) as session:
+        session.answer(2)
+        session.answer(2)
+        assert (session.pending(), _review_count(database)) == (2, 0)
+        session.answer(2)
+        assert (session.pending(), _review_count(database)) == (0, 3)
+
+
+def test_flush_by_tick(database):
+    deck_id = _deck(database, "deck", 10)
+    with StudySession(database, deck_id, flush_size=100, flush_interval=3600) as session:
+        session.answer(0)
+        assert session.tick() == 0
+        session.flush_interval = 0
+        assert session.tick() == 1
+        assert _review_count(database) == 1
+        card = database.conn.execute(
+            "SELECT repetitions, next_review_day FROM cards WHERE id = ("
+            "SELECT card_id FROM review_history)"
+        ).fetchone()
+        assert card['repetitions'] == 0 and card['next_review_day'] is not None
+
+
+def test_journal_replay_after_crash(database):
+    deck_id = _deck(database, "deck", 10)
+    crashed = StudySession(database, deck_id, flush_size=100)
+    crashed.start()
+    for _ in range(4):
+        crashed.answer(2)
+    # Simulate a crash: the process dies without flushing or closing
+    crashed._journal.close()
+    assert _review_count(database) == 0
+
+    with StudySession(database, deck_id) as session:
+        assert _review_count(database) == 4
+        assert session.current_card() is not None
+    # Replaying the same reviews again adds nothing
+    assert StudySession.recover_orphaned_journals(database, f"{database.db_path}.session-journal") == 0
+    assert _review_count(database) == 4
+    assert _journals(database) == []
+
+
+def test_concurrent_sessions_keep_their_journals(database):
+    first_deck = _deck(database, "first", 10)
+    second_deck = _deck(database, "second", 10)
+
+    first = StudySession(database, first_deck, flush_size=100)
+    first.start()
+    for _ in range(5):
+        first.answer(2)
+
+    second = StudySession(database, second_deck, flush_size=100)
+    assert second.start() == 0
+    assert first.journal_file != second.journal_file
+    assert _review_count(database) == 0
+
+    second.answer(1)
+    second.flush()
+    with open(first.journal_file, encoding='utf-8') as f:
+        assert len(f.readlines()) == 5
+
+    first.close()
+    second.close()
+    assert _review_count(database) == 6
+    assert _journals(database) == []